@@ -1,14 +1,16 @@
 import streamlit as st
-import numpy as np
-import cv2
-import pandas as pd
 from PIL import Image
 import io
-import time
-import matplotlib.pyplot as plt
 from datetime import datetime
 import os
 
+import metrics
+import preload
+
+# Start loading the model right away in case serve.py has not already
+preload.start()
+metrics.serve_from_env()
+
 # Page configuration must be the first Streamlit command
 st.set_page_config(
     page_title="Waste Classification System",
@@ -36,7 +38,7 @@ st.markdown("""
 
 # Add error handling for imports
 try:
-    from model import load_model, preprocess_image, predict_waste_class
+    from prediction_cache import PredictionCache
     from utils import save_classification_history, get_classification_history
     from waste_info import waste_categories, get_recycling_instructions
 except Exception as e:
@@ -82,11 +84,17 @@ st.title("♻️ Waste Classification System")
 @st.cache_resource
 def get_model():
     try:
-        return load_model()
+        # Usually already loaded and warmed by the preload thread
+        return preload.get_model()
     except Exception as e:
         st.error(f"Error loading model: {str(e)}")
         return None
 
+# Prediction cache shared by all sessions; set RECYCLEAI_CACHE_DIR to keep it across restarts
+@st.cache_resource
+def get_prediction_cache():
+    return PredictionCache(max_entries=512, disk_dir=os.environ.get("RECYCLEAI_CACHE_DIR"))
+
 # Try to load the model
 try:
     if st.session_state.model is None:
@@ -114,6 +122,9 @@ for category in waste_categories.keys():
         st.session_state.selected_category = category
         st.rerun()
 
+cache_stats = get_prediction_cache().stats()
+st.sidebar.caption(f"Prediction cache: {cache_stats['hits'] + cache_stats['disk_hits']} hits / {cache_stats['misses']} misses")
+
 st.sidebar.markdown("---")
 
 # Navigation
@@ -175,8 +186,18 @@ else:
                 
                 if st.button("🔍 Classify Waste", use_container_width=True):
                     with st.spinner("🔄 Processing image..."):
-                        img_array = preprocess_image(image)
-                        prediction, confidence = predict_waste_class(st.session_state.model, img_array)
+                        # Imported here so pages that never classify skip NumPy/OpenCV
+                        from model import preprocessor, top_prediction
+                        
+                        model = st.session_state.model
+                        with metrics.stage("classify"):
+                            predictions = get_prediction_cache().get_or_compute(
+                                uploaded_file.getvalue(),
+                                getattr(model, "version", None),
+                                lambda: model.predict(preprocessor(model)(uploaded_file.getvalue()))
+                            )
+                            prediction, confidence = top_prediction(model, predictions)
+                        metrics.increment("classifications", category=prediction)
                         
                         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                         history_entry = {
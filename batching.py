@@ -0,0 +1,200 @@
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import numpy as np
+
+import metrics
+
+# Weight of the newest gap in the moving average of request inter-arrival times
+ARRIVAL_SMOOTHING = 0.2
+
+class QueueFullError(RuntimeError):
+    """Raised when the micro-batching queue is full and a request is shed"""
+
+class MicroBatcher:
+    """
+    Gathers concurrent classification requests into batches
+    
+    Callers submit single preprocessed images from any thread. A background
+    thread collects them and dispatches one model.predict_batch call as soon
+    as max_batch_size images are waiting or the oldest one has waited
+    max_delay seconds, then hands each caller its own probability row.
+    
+    Waiting only pays off when more requests are about to arrive: a request
+    that finds the queue empty is dispatched at once unless requests have
+    recently been arriving more often than every max_delay seconds.
+    
+    Args:
+        model: Anything with predict_batch, e.g. WasteClassifier or InferenceEngine
+        max_batch_size: Largest batch handed to the model
+        max_delay: Longest time in seconds a request waits for a batch to fill
+        max_queue_size: Pending requests beyond this are rejected with QueueFullError
+    """
+    def __init__(self, model, max_batch_size=32, max_delay=0.005, max_queue_size=1024):
+        self.model = model
+        self.categories = model.categories
+        self.version = getattr(model, 'version', None)
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+        
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closed = threading.Event()
+        
+        self._stats_lock = threading.Lock()
+        self._requests = 0
+        self._rejected = 0
+        self._batches = 0
+        self._batch_size_total = 0
+        self._max_batch_seen = 0
+        self._waits = deque(maxlen=4096)
+        
+        # Moving average of the time between submissions, None until known
+        self._last_arrival = None
+        self._arrival_interval = None
+        
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+    
+    def submit(self, image_array):
+        """
+        Queue one image for classification
+        
+        Args:
+            image_array: Preprocessed image, with or without batch dimension
+        
+        Returns:
+            Future resolving to the image's probability vector
+        
+        Raises:
+            QueueFullError: If the queue is at capacity
+        """
+        if self._closed.is_set():
+            raise RuntimeError("MicroBatcher is closed")
+        
+        if len(image_array.shape) == 4:
+            image_array = image_array[0]
+        
+        future = Future()
+        now = time.perf_counter()
+        try:
+            self._queue.put_nowait((image_array, future, now))
+        except queue.Full:
+            with self._stats_lock:
+                self._rejected += 1
+            raise QueueFullError(f"Classification queue is full ({self._queue.maxsize} pending)")
+        
+        with self._stats_lock:
+            self._requests += 1
+            if self._last_arrival is not None:
+                # Any gap beyond max_delay means the same thing: nothing to wait for
+                interval = min(now - self._last_arrival, 2 * self.max_delay)
+                if self._arrival_interval is None:
+                    self._arrival_interval = interval
+                else:
+                    self._arrival_interval += ARRIVAL_SMOOTHING * (interval - self._arrival_interval)
+            self._last_arrival = now
+        return future
+    
+    def predict(self, image_array, timeout=None):
+        """
+        Classify one image, blocking until its batch has run
+        """
+        return self.submit(image_array).result(timeout)
+    
+    def predict_batch(self, image_batch, timeout=None):
+        """
+        Submit every image of a batch and wait for all of them
+        """
+        futures = [self.submit(image_array) for image_array in image_batch]
+        return np.stack([future.result(timeout) for future in futures])
+    
+    def _next_batch(self):
+        """
+        Block for the first request, then keep collecting until the batch
+        is full or the first request's deadline passes; a lone request is
+        returned at once unless requests are arriving faster than max_delay
+        """
+        while True:
+            try:
+                first = self._queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self._closed.is_set():
+                    return []
+        
+        batch = [first]
+        with self._stats_lock:
+            interval = self._arrival_interval
+        if self._queue.empty() and (interval is None or interval >= self.max_delay):
+            return batch
+        
+        deadline = first[2] + self.max_delay
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+            
+            dispatched = time.perf_counter()
+            futures = [future for _, future, _ in batch]
+            try:
+                predictions = self.model.predict_batch(np.stack([image for image, _, _ in batch]))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+            else:
+                for future, probs in zip(futures, predictions):
+                    future.set_result(probs)
+            
+            with self._stats_lock:
+                self._batches += 1
+                self._batch_size_total += len(batch)
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+                self._waits.extend(dispatched - enqueued for _, _, enqueued in batch)
+            
+            if metrics.ENABLED:
+                metrics.observe('batch_inference', time.perf_counter() - dispatched)
+                for _, _, enqueued in batch:
+                    metrics.observe('batch_wait', dispatched - enqueued)
+    
+    def metrics(self):
+        """
+        Get scheduler metrics
+        
+        Returns:
+            Dictionary with queue depth, request/batch counters, batch sizes
+            and wait times (in milliseconds) over the most recent requests
+        """
+        with self._stats_lock:
+            waits = np.array(self._waits) * 1000
+            return {
+                "queue_depth": self._queue.qsize(),
+                "requests": self._requests,
+                "rejected": self._rejected,
+                "batches": self._batches,
+                "avg_batch_size": self._batch_size_total / self._batches if self._batches else 0.0,
+                "max_batch_size": self._max_batch_seen,
+                "avg_wait_ms": float(waits.mean()) if len(waits) else 0.0,
+                "p99_wait_ms": float(np.percentile(waits, 99)) if len(waits) else 0.0,
+            }
+    
+    def close(self):
+        """
+        Stop accepting requests and finish the ones already queued
+        """
+        self._closed.set()
+        self._thread.join()
@@ -0,0 +1,66 @@
+"""
+Latency and throughput of the heuristic and torch backends at several batch sizes
+
+    python -m benchmarks.bench_backends --weights waste_model.pth
+
+Without --weights a randomly initialised network is used; CPU cost does not
+depend on the weight values.
+"""
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from benchmarks.common import synthetic_image, time_call
+from model import WasteClassifier, preprocess_image
+
+
+def load_torch_backend(weights_path):
+    import torch
+    from torch_backend import TorchWasteClassifier, build_network
+    
+    if weights_path is None:
+        weights_path = os.path.join(tempfile.mkdtemp(), "random_waste_model.pth")
+        torch.save(build_network().state_dict(), weights_path)
+    return TorchWasteClassifier(weights_path, warmup_batch_sizes=(1, 8))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 64])
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+    
+    frames = [preprocess_image(synthetic_image(640, 480, seed=seed), as_uint8=True)[0]
+              for seed in range(8)]
+    backends = {
+        "heuristic": WasteClassifier(),
+        "torch": load_torch_backend(args.weights),
+    }
+    
+    report = []
+    for batch_size in args.batch_sizes:
+        batch = np.stack([frames[i % len(frames)] for i in range(batch_size)])
+        for name, model in backends.items():
+            timing = time_call(lambda: model.predict_batch(batch), repeat=args.repeat, warmup=1)
+            row = {
+                "backend": name,
+                "batch_size": batch_size,
+                "latency_ms": timing["median"] * 1000,
+                "images_per_second": batch_size / timing["median"],
+            }
+            report.append(row)
+            print(f"{name:>9} batch {batch_size:>3}: {row['latency_ms']:9.2f} ms/batch, "
+                  f"{row['images_per_second']:8.1f} images/s")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Throughput and latency of concurrent clients with and without micro-batching
+
+    python -m benchmarks.bench_batching --clients 16
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from batching import MicroBatcher
+from benchmarks.common import synthetic_image
+from model import WasteClassifier, preprocess_image
+
+
+def run_clients(predict, image, clients, requests_per_client):
+    """
+    Hammer predict from several threads
+
+    Returns:
+        (images per second, p99 latency in milliseconds)
+    """
+    latencies = [[] for _ in range(clients)]
+    
+    def client(index):
+        for _ in range(requests_per_client):
+            start = time.perf_counter()
+            predict(image)
+            latencies[index].append(time.perf_counter() - start)
+    
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    all_latencies = np.concatenate(latencies) * 1000
+    return clients * requests_per_client / elapsed, float(np.percentile(all_latencies, 99))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="Requests per client")
+    parser.add_argument("--delay-ms", type=float, default=5.0)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    args = parser.parse_args()
+    
+    image = preprocess_image(synthetic_image(), as_uint8=True)
+    model = WasteClassifier()
+    
+    rate, p99 = run_clients(model.predict, image, args.clients, args.requests)
+    print(f"    direct: {rate:8.1f} images/s, p99 {p99:6.2f} ms")
+    
+    batcher = MicroBatcher(model, max_batch_size=args.max_batch_size,
+                           max_delay=args.delay_ms / 1000)
+    rate, p99 = run_clients(batcher.predict, image, args.clients, args.requests)
+    batcher.close()
+    metrics = batcher.metrics()
+    print(f"   batched: {rate:8.1f} images/s, p99 {p99:6.2f} ms "
+          f"(avg batch {metrics['avg_batch_size']:.1f}, p99 wait {metrics['p99_wait_ms']:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
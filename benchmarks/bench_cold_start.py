@@ -0,0 +1,137 @@
+"""
+Cold-start benchmark: import-time breakdown and time to first classification
+
+    python -m benchmarks.bench_cold_start
+
+Every measurement runs in a fresh interpreter so nothing is cached in
+sys.modules. "first classification" is timed from launching the
+interpreter to the first predicted label, after a simulated server boot:
+once loading the model inline on demand (the old behaviour) and once with
+preload started before the boot, so loading overlaps it. The time at which
+the preloaded model became ready is reported as well.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules whose import cost shows up on the app's startup path
+IMPORTS = ["numpy", "PIL.Image", "cv2", "model", "utils", "preload", "pandas",
+           "plotly.express", "streamlit"]
+
+# Both scripts boot a "server" (a sleep standing in for the web framework's
+# startup, passed as argv[1] seconds) and then serve one request, and print
+# wall-clock times so the parent can measure from interpreter start
+INLINE_SCRIPT = """
+import json, sys, time
+time.sleep(float(sys.argv[1]))
+from model import load_model, preprocess_image, top_prediction
+from benchmarks.common import synthetic_image_bytes
+data = synthetic_image_bytes()
+model = load_model()
+top_prediction(model, model.predict(preprocess_image(data, as_uint8=True)))
+print(json.dumps({"label": time.time()}))
+"""
+
+PRELOAD_SCRIPT = """
+import json, sys, threading, time
+import preload
+preload.start()
+ready = {}
+def wait_for_model():
+    preload.get_model()
+    ready["at"] = time.time()
+watcher = threading.Thread(target=wait_for_model)
+watcher.start()
+time.sleep(float(sys.argv[1]))
+from model import preprocess_image, top_prediction
+from benchmarks.common import synthetic_image_bytes
+data = synthetic_image_bytes()
+model = preload.get_model()
+top_prediction(model, model.predict(preprocess_image(data, as_uint8=True)))
+label = time.time()
+watcher.join()
+print(json.dumps({"label": label, "ready": ready["at"]}))
+"""
+
+
+def run_python(args):
+    return subprocess.run([sys.executable, *args], cwd=REPO_ROOT, capture_output=True,
+                          text=True, check=True)
+
+
+def import_time_ms(module):
+    """
+    Cumulative import time of a module in a fresh interpreter, from -X importtime
+    """
+    result = run_python(["-X", "importtime", "-c", f"import {module}"])
+    for line in reversed(result.stderr.splitlines()):
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if name == module:
+            return int(cumulative) / 1000
+    return None
+
+
+def timed_run(script, boot_seconds):
+    """
+    Run script in a fresh interpreter
+    
+    Returns:
+        Dictionary of the script's events in seconds since the interpreter
+        was launched
+    """
+    launched = time.time()
+    result = run_python(["-c", script, str(boot_seconds)])
+    events = json.loads(result.stdout.strip().splitlines()[-1])
+    return {name: at - launched for name, at in events.items()}
+
+
+def median_run(script, boot_seconds, repeat):
+    runs = [timed_run(script, boot_seconds) for _ in range(repeat)]
+    return {name: sorted(run[name] for run in runs)[len(runs) // 2] for name in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--boot-ms", type=float, default=500.0,
+                        help="Simulated server startup before the first request")
+    parser.add_argument("--output", default=None, help="Write the report as JSON")
+    args = parser.parse_args()
+    
+    report = {"imports_ms": {}}
+    print("import time (cumulative, fresh interpreter):")
+    for module in IMPORTS:
+        try:
+            elapsed = import_time_ms(module)
+        except subprocess.CalledProcessError:
+            elapsed = None
+        report["imports_ms"][module] = elapsed
+        shown = f"{elapsed:8.1f} ms" if elapsed is not None else "   not installed"
+        print(f"  {module:<15} {shown}")
+    
+    boot_seconds = args.boot_ms / 1000
+    inline = median_run(INLINE_SCRIPT, boot_seconds, args.repeat)
+    preloaded = median_run(PRELOAD_SCRIPT, boot_seconds, args.repeat)
+    report["boot_s"] = boot_seconds
+    report["first_classification_inline_s"] = inline["label"]
+    report["first_classification_preloaded_s"] = preloaded["label"]
+    report["preload_ready_s"] = preloaded["ready"]
+    print(f"interpreter start to first label, {args.boot_ms:.0f} ms simulated boot:")
+    print(f"  loading inline: {inline['label'] * 1000:8.1f} ms")
+    print(f"  preloaded:      {preloaded['label'] * 1000:8.1f} ms "
+          f"(model ready {preloaded['ready'] * 1000:.1f} ms after start)")
+    
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
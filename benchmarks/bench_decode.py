@@ -0,0 +1,55 @@
+"""
+Decode and resize time for large camera JPEGs: full decode vs draft mode
+
+    python -m benchmarks.bench_decode
+"""
+import argparse
+import io
+import time
+
+from PIL import Image
+
+from benchmarks.common import synthetic_image_bytes
+from model import INPUT_SIZE, preprocess_image
+
+
+def full_decode(data, timings):
+    """Preprocessing as it was before draft-mode decoding"""
+    start = time.perf_counter()
+    image = Image.open(io.BytesIO(data)).convert('RGB')
+    decoded = time.perf_counter()
+    image.resize(INPUT_SIZE)
+    timings['decode'] = decoded - start
+    timings['resize'] = time.perf_counter() - decoded
+
+
+def median_timings(func, data, repeat):
+    samples = []
+    for _ in range(repeat):
+        timings = {}
+        func(data, timings)
+        samples.append(timings)
+    return {
+        stage: sorted(sample[stage] for sample in samples)[repeat // 2]
+        for stage in ('decode', 'resize')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    
+    for megapixels, size in ((12, (4000, 3000)), (48, (8000, 6000))):
+        data = synthetic_image_bytes(*size, format='JPEG')
+        for name, func in (
+            ("full", full_decode),
+            ("draft", lambda d, t: preprocess_image(d, as_uint8=True, timings=t)),
+        ):
+            timing = median_timings(func, data, args.repeat)
+            print(f"{megapixels:>2} MP {name:>5}: decode {timing['decode'] * 1000:8.1f} ms, "
+                  f"resize {timing['resize'] * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Data-parallel training: throughput per process count and equivalence with one process
+
+    python -m benchmarks.bench_distributed --nproc 2 4
+
+Trains a small BatchNorm-free network (per-process BatchNorm statistics
+would legitimately differ) on a fixed synthetic dataset, once in a single
+process and once per process count, and compares the final weights. Exits
+with status 1 when they differ by more than --tolerance.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import torch
+import torch.nn as nn
+from torch.utils.data import TensorDataset
+
+from train import init_distributed, launch_local, make_loader, train_model
+
+
+def tiny_network():
+    torch.manual_seed(0)
+    return nn.Sequential(
+        nn.Conv2d(3, 16, 3, padding=1), nn.ReLU(), nn.MaxPool2d(2),
+        nn.Conv2d(16, 32, 3, padding=1), nn.ReLU(), nn.AdaptiveAvgPool2d(1),
+        nn.Flatten(), nn.Linear(32, 6),
+    )
+
+
+def synthetic_dataset(samples, size):
+    generator = torch.Generator().manual_seed(0)
+    images = torch.randn(samples, 3, size, size, generator=generator)
+    labels = torch.randint(0, 6, (samples,), generator=generator)
+    return TensorDataset(images, labels)
+
+
+def train(result_path, samples, size, batch_size, epochs):
+    """Train in this process (a member of the group, if there is one); rank 0 saves the result"""
+    rank, _ = init_distributed()
+    dataset = synthetic_dataset(samples, size)
+    # Unshuffled, so the union of the shards of a step is the single-process batch
+    train_loader = make_loader(dataset, batch_size, shuffle=False, num_workers=0)
+    val_loader = make_loader(dataset, batch_size, shuffle=False, num_workers=0)
+    model = tiny_network()
+    optimizer = torch.optim.SGD(model.parameters(), lr=0.05, momentum=0.9)
+    history = train_model(model, train_loader, val_loader, nn.CrossEntropyLoss(), optimizer,
+                          epochs, 'cpu', save_path=None)
+    if rank == 0:
+        torch.save({'state': model.state_dict(), 'history': history}, result_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--nproc", type=int, nargs="+", default=[2])
+    parser.add_argument("--samples", type=int, default=512)
+    parser.add_argument("--size", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--tolerance", type=float, default=1e-5)
+    args = parser.parse_args()
+    
+    train_args = (args.samples, args.size, args.batch_size, args.epochs)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for nproc in [1, *args.nproc]:
+            result_path = os.path.join(tmp, f"{nproc}.pt")
+            if nproc == 1:
+                train(result_path, *train_args)
+            else:
+                launch_local(train, nproc, result_path, *train_args)
+            results[nproc] = torch.load(result_path)
+    
+    print(f"{args.samples} samples at {args.size} px, global batch {args.batch_size}, "
+          f"{os.cpu_count()} CPUs")
+    reference = results[1]
+    failed = False
+    for nproc, result in results.items():
+        rate = max(epoch["samples_per_second"] for epoch in result["history"])
+        difference = max((result["state"][name] - value).abs().max().item()
+                         for name, value in reference["state"].items())
+        failed |= difference > args.tolerance
+        print(f"{nproc:3d} processes: {rate:10.1f} samples/s  "
+              f"({rate / max(e['samples_per_second'] for e in reference['history']):.2f}x)  "
+              f"max weight difference {difference:.2e}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Throughput of the process-pool InferenceEngine against in-process inference
+
+    python -m benchmarks.bench_engine --images 512
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+
+from benchmarks.common import synthetic_image
+from inference_engine import InferenceEngine
+from model import WasteClassifier, preprocess_image
+
+
+def throughput(model, batch, repeat):
+    model.predict_batch(batch)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        model.predict_batch(batch)
+    return repeat * len(batch) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+    
+    frames = [preprocess_image(synthetic_image(640, 480, seed=seed), as_uint8=True)[0]
+              for seed in range(16)]
+    batch = np.stack([frames[i % len(frames)] for i in range(args.images)])
+    
+    baseline = throughput(WasteClassifier(), batch, args.repeat)
+    print(f"in-process: {baseline:8.1f} images/s")
+    
+    workers = 1
+    while workers <= args.max_workers:
+        with InferenceEngine(num_workers=workers) as engine:
+            rate = throughput(engine, batch, args.repeat)
+        print(f"{workers:>3} workers: {rate:8.1f} images/s "
+              f"({rate / baseline:4.2f}x, {rate / baseline / workers:4.0%} per-core efficiency)")
+        workers *= 2
+    
+    if args.max_workers > 1 and workers // 2 != args.max_workers:
+        with InferenceEngine(num_workers=args.max_workers) as engine:
+            rate = throughput(engine, batch, args.repeat)
+        print(f"{args.max_workers:>3} workers: {rate:8.1f} images/s ({rate / baseline:4.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
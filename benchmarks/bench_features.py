@@ -0,0 +1,102 @@
+"""
+Per-image feature extraction time: fused extractor vs the original code
+
+    python -m benchmarks.bench_features
+
+Also checks that both produce the same features on the same inputs.
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from benchmarks.common import synthetic_image, time_call
+from features import extract_features
+from model import preprocess_image
+
+
+def legacy_features(image_array):
+    """Feature code as it was inlined in WasteClassifier.predict"""
+    img_cv = (image_array * 255).astype(np.uint8)
+    avg_colors = np.mean(image_array, axis=(0, 1))
+    r, g, b = avg_colors
+    color_variance = np.var(image_array, axis=(0, 1))
+    texture_score = np.mean(color_variance)
+    brightness = np.mean(image_array)
+    green_ratio = g / (r + g + b + 1e-6)
+    gray = cv2.cvtColor(img_cv, cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = np.mean(edges > 0)
+    hsv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2HSV)
+    saturation = np.mean(hsv[:, :, 1]) / 255.0
+    return {
+        "brightness": brightness,
+        "texture_score": texture_score,
+        "green_ratio": green_ratio,
+        "saturation": saturation,
+        "edge_density": edge_density,
+    }
+
+
+def batched_statistics(image_batch):
+    """
+    Channel means and variances with batch-axis NumPy reductions, as before
+    extract_features moved them to cv2.meanStdDev (float32 in place for uint8)
+    """
+    if image_batch.dtype == np.uint8:
+        means = np.mean(image_batch, axis=(1, 2), dtype=np.float32)
+        deviation = image_batch.astype(np.float32)
+        deviation -= means[:, np.newaxis, np.newaxis, :]
+        np.square(deviation, out=deviation)
+        return means / 255.0, np.mean(deviation, axis=(1, 2)) / (255.0 * 255.0)
+    return np.mean(image_batch, axis=(1, 2)), np.var(image_batch, axis=(1, 2))
+
+
+def check_match(images):
+    """Assert the fused extractor reproduces the legacy features"""
+    for image in images:
+        float_input = preprocess_image(image)
+        expected = legacy_features(float_input[0])
+        for batch in (float_input, preprocess_image(image, as_uint8=True)):
+            actual = extract_features(batch).row(0)
+            for name, value in expected.items():
+                # uint8 input skips the float truncation, so edge and
+                # saturation may differ by a pixel or two
+                assert abs(actual[name] - value) < 1e-3, (name, actual[name], value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    
+    images = [synthetic_image(640, 480, seed=seed) for seed in range(8)]
+    check_match(images)
+    print("features match the legacy implementation")
+    
+    float_input = preprocess_image(images[0])
+    uint8_input = preprocess_image(images[0], as_uint8=True)
+    
+    legacy = time_call(lambda: legacy_features(float_input[0]), repeat=args.repeat)
+    fused_float = time_call(lambda: extract_features(float_input), repeat=args.repeat)
+    fused_uint8 = time_call(lambda: extract_features(uint8_input), repeat=args.repeat)
+    
+    for name, timing in (("legacy", legacy), ("fused float", fused_float),
+                         ("fused uint8", fused_uint8)):
+        speedup = legacy["median"] / timing["median"]
+        print(f"{name:>12}: {timing['median'] * 1000:7.3f} ms/image ({speedup:4.1f}x)")
+    
+    # Only the channel statistics, per image of a 32-image batch
+    uint8_batch = np.concatenate([preprocess_image(image, as_uint8=True) for image in images] * 4)
+    float_batch = uint8_batch / 255.0
+    print("channel statistics, 32-image batch:")
+    for name, batch in (("float", float_batch), ("uint8", uint8_batch)):
+        numpy_timing = time_call(lambda: batched_statistics(batch), repeat=args.repeat // 10 or 1)
+        cv2_timing = time_call(lambda: [cv2.meanStdDev(image) for image in batch],
+                               repeat=args.repeat // 10 or 1)
+        print(f"{name:>12}: numpy batch {numpy_timing['median'] / len(batch) * 1000:7.3f} ms/image, "
+              f"cv2.meanStdDev {cv2_timing['median'] / len(batch) * 1000:7.3f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Peak memory and latency of preprocess_image + predict, float64 vs uint8 path
+
+    python -m benchmarks.bench_preprocess_memory
+
+Peak memory is measured with tracemalloc, which sees NumPy buffers but not
+PIL's internal decode buffer, so the numbers are the per-image overhead on
+top of the decoded image itself.
+"""
+import argparse
+import tracemalloc
+
+import numpy as np
+
+from benchmarks.common import synthetic_image, time_call
+from model import WasteClassifier, preprocess_image
+
+# Per-image peak for the uint8 path; small replicas are sized against this
+UINT8_PEAK_TARGET_BYTES = 1024 * 1024
+
+
+def measure_peak(func):
+    """Return the peak traced allocation of one call in bytes"""
+    func()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+    
+    model = WasteClassifier()
+    image = synthetic_image(1024, 768)
+    
+    results = {}
+    for name, as_uint8 in (("float64", False), ("uint8", True)):
+        def run():
+            return model.predict(preprocess_image(image, as_uint8=as_uint8))
+        
+        peak = measure_peak(run)
+        timing = time_call(run, repeat=args.repeat)
+        results[name] = peak
+        print(f"{name:>8}: peak {peak / 1024:8.1f} KiB, "
+              f"median {timing['median'] * 1000:6.2f} ms")
+    
+    # Features from both paths should agree up to uint8 quantisation
+    float_input = preprocess_image(image)
+    uint8_input = preprocess_image(image, as_uint8=True)
+    np.testing.assert_allclose(float_input * 255, uint8_input, atol=1e-6)
+    
+    print(f"peak reduction: {results['float64'] / results['uint8']:.1f}x")
+    status = "OK" if results["uint8"] <= UINT8_PEAK_TARGET_BYTES else "OVER TARGET"
+    print(f"uint8 target {UINT8_PEAK_TARGET_BYTES / 1024:.0f} KiB: {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Training epoch wall time: per-step host syncs vs the optimized train_model loop
+
+    python -m benchmarks.bench_training --samples 128 --size 96 --channels-last --bf16
+"""
+import argparse
+import time
+
+import torch
+import torch.nn as nn
+from torch.utils.data import DataLoader, TensorDataset
+
+from torch_backend import build_network
+from train import train_model
+
+
+def legacy_epoch(model, loader, criterion, optimizer):
+    """The train_model loop before it stopped syncing on every step"""
+    model.train()
+    running_loss = 0.0
+    correct = 0
+    total = 0
+    for images, labels in loader:
+        optimizer.zero_grad()
+        outputs = model(images)
+        loss = criterion(outputs, labels)
+        loss.backward()
+        optimizer.step()
+        running_loss += loss.item()
+        _, predicted = torch.max(outputs.data, 1)
+        total += labels.size(0)
+        correct += (predicted == labels).sum().item()
+    return running_loss / len(loader), 100 * correct / total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--samples", type=int, default=128)
+    parser.add_argument("--size", type=int, default=96)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--channels-last", action="store_true")
+    parser.add_argument("--bf16", action="store_true")
+    parser.add_argument("--compile", action="store_true")
+    args = parser.parse_args()
+    
+    generator = torch.Generator().manual_seed(0)
+    images = torch.randn(args.samples, 3, args.size, args.size, generator=generator)
+    labels = torch.randint(0, 6, (args.samples,), generator=generator)
+    loader = DataLoader(TensorDataset(images, labels), batch_size=args.batch_size)
+    val_loader = DataLoader(TensorDataset(images[:args.batch_size], labels[:args.batch_size]),
+                            batch_size=args.batch_size)
+    criterion = nn.CrossEntropyLoss()
+    
+    def fresh_model():
+        torch.manual_seed(0)
+        model = build_network(pretrained=False)
+        return model, torch.optim.Adam(model.parameters(), lr=0.001)
+    
+    model, optimizer = fresh_model()
+    legacy_seconds = []
+    for _ in range(args.epochs):
+        start = time.perf_counter()
+        legacy_epoch(model, loader, criterion, optimizer)
+        legacy_seconds.append(time.perf_counter() - start)
+    
+    model, optimizer = fresh_model()
+    history = train_model(model, loader, val_loader, criterion, optimizer, args.epochs, "cpu",
+                          channels_last=args.channels_last, bf16=args.bf16,
+                          compile_model=args.compile, save_path=None)
+    
+    # The first epoch pays for one-off costs (oneDNN primitive caches, compilation)
+    legacy = min(legacy_seconds)
+    optimized = min(epoch["train_seconds"] for epoch in history)
+    print(f"{args.samples} samples at {args.size} px, batch {args.batch_size}, "
+          f"torch threads {torch.get_num_threads()}")
+    print(f"legacy loop:    {legacy:8.2f} s/epoch  {args.samples / legacy:8.1f} samples/s")
+    print(f"train_model:    {optimized:8.2f} s/epoch  {args.samples / optimized:8.1f} samples/s  "
+          f"({legacy / optimized:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
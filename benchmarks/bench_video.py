@@ -0,0 +1,35 @@
+"""
+Streaming classification throughput on a generated video file
+
+    python -m benchmarks.bench_video --frames 300
+"""
+import argparse
+import os
+import tempfile
+
+from video import classify_stream, write_synthetic_video
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--batch-size", type=int, default=8)
+    args = parser.parse_args()
+    
+    path = os.path.join(tempfile.mkdtemp(), "synthetic.avi")
+    write_synthetic_video(path, num_frames=args.frames, fps=args.fps, size=(1280, 720))
+    
+    for realtime in (False, True):
+        stats_out = []
+        results = list(classify_stream(path, batch_size=args.batch_size, realtime=realtime,
+                                       stats_out=stats_out))
+        stats = stats_out[0].as_dict()
+        mode = "realtime" if realtime else "every frame"
+        print(f"{mode:>11}: {stats['processed_fps']:7.1f} frames/s processed, "
+              f"{stats['frames_processed']} classified, {stats['frames_dropped']} dropped "
+              f"of {stats['frames_read']}, {len(results)} results")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Shared helpers for the benchmark scripts
+
+Run the benchmarks from the repository root, e.g.
+    python -m benchmarks.bench_preprocess_memory
+"""
+import io
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def synthetic_image(width=640, height=480, seed=0):
+    """
+    Build a deterministic RGB test image with smooth colour regions,
+    texture noise and a few hard edges
+    
+    Returns:
+        PIL Image in RGB mode
+    """
+    if width * height > 4_000_000:
+        # Render large camera-sized frames from a smaller one to keep
+        # generation cheap; the decoder cost is what is being measured
+        return synthetic_image(width // 4, height // 4, seed).resize(
+            (width, height), Image.BILINEAR)
+    
+    rng = np.random.default_rng(seed)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    base = rng.random(3, dtype=np.float32)
+    gradient = np.stack([
+        x / width * base[0],
+        y / height * base[1],
+        (x + y) / (width + height) * base[2],
+    ], axis=-1)
+    noise = rng.normal(0.0, 0.05, size=(height, width, 3)).astype(np.float32)
+    pixels = np.clip(gradient + noise, 0.0, 1.0)
+    
+    # A few rectangles give Canny something to find
+    for _ in range(4):
+        x0, y0 = rng.integers(0, width // 2), rng.integers(0, height // 2)
+        pixels[y0:y0 + height // 4, x0:x0 + width // 4] = rng.random(3)
+    
+    return Image.fromarray((pixels * 255).astype(np.uint8), 'RGB')
+
+
+def synthetic_image_bytes(width=640, height=480, seed=0, format='JPEG'):
+    """Encode a synthetic image the way an upload would arrive"""
+    buffer = io.BytesIO()
+    synthetic_image(width, height, seed).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+def time_call(func, repeat=20, warmup=2, setup=None):
+    """
+    Time a zero-argument callable
+    
+    Args:
+        func: Callable to time
+        repeat: Number of timed calls
+        warmup: Untimed calls made first
+        setup: Optional callable run untimed before every call, e.g. to
+            restore a file that func modifies
+    
+    Returns:
+        Dictionary with best, first quartile, median, third quartile and
+        mean wall time in seconds
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        func()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        "best": samples[0],
+        "q1": samples[len(samples) // 4],
+        "median": samples[len(samples) // 2],
+        "q3": samples[(3 * len(samples)) // 4],
+        "mean": sum(samples) / len(samples),
+    }
@@ -0,0 +1,271 @@
+"""
+Reproducible benchmark suite for the classification and history hot paths
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --output new.json --compare baseline.json
+
+Inputs are synthetic and seeded: images at several resolutions and history
+files from 10 up to 1,000,000 entries. Results are written as JSON; with
+--compare, a benchmark is flagged as a regression, and the exit status is
+1, only when its median is slower than the baseline's by more than
+--threshold and by more than --min-delta-ms, and its interquartile range
+lies entirely above the baseline's, so run-to-run noise on sub-millisecond
+timings does not trip the gate. A slowdown shared by the whole run (a
+busier machine) is factored out first.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import model
+import utils
+from benchmarks.common import synthetic_image, synthetic_image_bytes, time_call
+
+RESOLUTIONS = {
+    "224": (224, 224),
+    "vga": (640, 480),
+    "fullhd": (1920, 1080),
+    "12mp": (4000, 3000),
+}
+
+HISTORY_SIZES = [10, 1_000, 100_000, 1_000_000]
+QUICK_HISTORY_SIZES = [10, 1_000, 10_000]
+
+CATEGORIES = ['plastic', 'glass', 'metal', 'paper', 'organic', 'e-waste']
+
+
+def synthetic_history(size, seed=0):
+    """
+    Build history entries spread over the last 30 days
+    
+    Entries carry no image so that million-entry files stay manageable;
+    the analytics paths never look at the image anyway.
+    """
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    return [
+        {
+            "timestamp": (start + timedelta(seconds=rng.randrange(30 * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+            "category": rng.choice(CATEGORIES),
+            "confidence": rng.uniform(20, 100),
+        }
+        for _ in range(size)
+    ]
+
+
+def write_history_file(path, entries):
+    """Write entries in the format utils.HISTORY_FILE uses, one JSON object per line"""
+    with open(path, "w") as f:
+        f.writelines(json.dumps(entry, separators=(",", ":")) + "\n" for entry in entries)
+
+
+def repeat_for(size):
+    """Fewer repetitions for the expensive large inputs"""
+    if size >= 100_000:
+        return 3
+    if size >= 10_000:
+        return 5
+    return 20
+
+
+def bench_classification(results, repeat):
+    classifier = model.WasteClassifier(seed=0)
+    
+    for name, size in RESOLUTIONS.items():
+        data = synthetic_image_bytes(*size)
+        results[f"preprocess_image[{name}]"] = time_call(
+            lambda: model.preprocess_image(data, as_uint8=True), repeat=repeat)
+    
+    image = synthetic_image(640, 480)
+    float_input = model.preprocess_image(image)
+    uint8_input = model.preprocess_image(image, as_uint8=True)
+    results["WasteClassifier.predict[float]"] = time_call(
+        lambda: classifier.predict(float_input), repeat=repeat)
+    results["WasteClassifier.predict[uint8]"] = time_call(
+        lambda: classifier.predict(uint8_input), repeat=repeat)
+    results["predict_waste_class"] = time_call(
+        lambda: model.predict_waste_class(classifier, uint8_input), repeat=repeat)
+
+
+def bench_history(results, sizes, workdir):
+    original_history_file = utils.HISTORY_FILE
+    entry_image = synthetic_image_bytes(64, 64)
+    try:
+        for size in sizes:
+            master = os.path.join(workdir, f"history_{size}.master")
+            write_history_file(master, synthetic_history(size))
+            utils.HISTORY_FILE = os.path.join(workdir, f"history_{size}.jsonl")
+            
+            def restore():
+                shutil.copyfile(master, utils.HISTORY_FILE)
+            
+            def save():
+                utils.save_classification_history({
+                    "timestamp": "2025-01-31 12:00:00",
+                    "category": "plastic",
+                    "confidence": 90.0,
+                    "image": entry_image,
+                })
+            
+            repeat = repeat_for(size)
+            results[f"save_classification_history[{size}]"] = time_call(
+                save, repeat=repeat, warmup=1, setup=restore)
+            
+            restore()
+            for name, func in (
+                ("get_classification_history", utils.get_classification_history),
+                ("get_stats_by_category", utils.get_stats_by_category),
+                ("get_stats_over_time", utils.get_stats_over_time),
+                ("get_overview_stats", utils.get_overview_stats),
+            ):
+                results[f"{name}[{size}]"] = time_call(func, repeat=repeat, warmup=1)
+    finally:
+        utils.HISTORY_FILE = original_history_file
+
+
+def bench_history_db(results, sizes, workdir):
+    """The same history paths on the SQLite store (RECYCLEAI_HISTORY_DB)"""
+    from history_store import HistoryStore
+    
+    original_history_db = utils.HISTORY_DB
+    entry_image = synthetic_image_bytes(64, 64)
+    try:
+        for size in sizes:
+            utils.HISTORY_DB = os.path.join(workdir, f"history_{size}.sqlite")
+            HistoryStore.for_path(utils.HISTORY_DB).extend(synthetic_history(size))
+            
+            def save():
+                utils.save_classification_history({
+                    "timestamp": "2025-01-31 12:00:00",
+                    "category": "plastic",
+                    "confidence": 90.0,
+                    "image": entry_image,
+                })
+            
+            repeat = repeat_for(size)
+            results[f"sqlite.save_classification_history[{size}]"] = time_call(save, repeat=repeat, warmup=1)
+            for name, func in (
+                ("get_classification_history", utils.get_classification_history),
+                ("get_stats_by_category", utils.get_stats_by_category),
+                ("get_stats_over_time", utils.get_stats_over_time),
+                ("get_overview_stats", utils.get_overview_stats),
+            ):
+                results[f"sqlite.{name}[{size}]"] = time_call(func, repeat=repeat, warmup=1)
+    finally:
+        utils.HISTORY_DB = original_history_db
+
+
+def is_regression(timing, previous, threshold, min_delta):
+    """
+    Whether timing is reliably slower than previous: by more than threshold
+    (relative) and min_delta (seconds) in the median, with no overlap of
+    the interquartile ranges
+    """
+    delta = timing["median"] - previous["median"]
+    if delta <= min_delta or timing["median"] <= previous["median"] * (1 + threshold):
+        return False
+    if "q1" in timing and "q3" in previous:
+        return timing["q1"] > previous["q3"]
+    # Baselines from before quartiles were recorded: fall back to best-of-N
+    return timing["best"] > previous["best"] * (1 + threshold)
+
+
+def compare(results, baseline, threshold, min_delta=0.0):
+    """
+    Print a comparison against a baseline run
+    
+    When the whole run is slower than the baseline (a busier or throttled
+    machine), every timing is first divided by the median slowdown across
+    all benchmarks, so only benchmarks that slowed down more than the rest
+    can be flagged.
+    
+    Returns:
+        List of benchmark names that regressed (see is_regression)
+    """
+    previous_results = baseline.get("results", {})
+    ratios = sorted(timing["median"] / previous_results[name]["median"]
+                    for name, timing in results.items() if name in previous_results)
+    drift = max(1.0, ratios[len(ratios) // 2]) if ratios else 1.0
+    if drift > 1.0:
+        print(f"  whole run {drift:.2f}x slower than the baseline; timings are normalised by it")
+    
+    regressions = []
+    for name, timing in results.items():
+        previous = previous_results.get(name)
+        if previous is None:
+            print(f"  {name:<45} new")
+            continue
+        ratio = timing["median"] / previous["median"]
+        normalised = {key: value / drift for key, value in timing.items()}
+        flag = ""
+        if is_regression(normalised, previous, threshold, min_delta):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"  {name:<45} {previous['median'] * 1000:10.3f} -> "
+              f"{timing['median'] * 1000:10.3f} ms ({ratio:5.2f}x){flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", default=None, help="Baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                        help="Relative slowdown of the median that counts as a regression")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Smallest absolute slowdown of the median that counts as a regression")
+    parser.add_argument("--quick", action="store_true",
+                        help="Smaller history files for a fast smoke run")
+    parser.add_argument("--history-sizes", type=int, nargs="+", default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    
+    sizes = args.history_sizes or (QUICK_HISTORY_SIZES if args.quick else HISTORY_SIZES)
+    np.random.seed(0)
+    
+    results = {}
+    bench_classification(results, args.repeat)
+    workdir = tempfile.mkdtemp(prefix="recycleai-bench-")
+    try:
+        bench_history(results, sizes, workdir)
+        bench_history_db(results, sizes, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    
+    report = {
+        "meta": {
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    
+    for name, timing in results.items():
+        print(f"  {name:<45} {timing['median'] * 1000:10.3f} ms")
+    print(f"results written to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"comparison against {args.compare}:")
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms / 1000)
+        if regressions:
+            print(f"{len(regressions)} regression(s) above {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Bulk classification of a directory tree of images
+
+    python classify_dir.py captures/2025-03-17 --output audit.jsonl
+    python classify_dir.py captures/ --output audit.csv --workers 8
+    python classify_dir.py captures/ --output audit.parquet   # needs pyarrow
+
+Images are decoded and classified in worker processes and results are
+streamed to the output as they arrive. The output doubles as the checkpoint:
+rerunning the same command skips every file already recorded there, so an
+interrupted run resumes where it stopped.
+"""
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+from model import IMAGE_EXTENSIONS, WasteClassifier, preprocessor
+
+CATEGORIES = WasteClassifier().categories
+FIELDS = ["path", "category", "confidence", *CATEGORIES, "error"]
+
+# Classifier owned by each worker process, created by _init_worker
+_worker_model = None
+
+def _init_worker():
+    global _worker_model
+    import cv2
+    cv2.setNumThreads(1)
+    _worker_model = WasteClassifier(seed=np.random.SeedSequence([os.getpid()]))
+
+def _classify_chunk(root, paths):
+    """
+    Decode and classify a chunk of files in a worker
+    
+    Returns:
+        List of result rows; unreadable files get an error row
+    """
+    rows = []
+    arrays = []
+    preprocess = preprocessor(_worker_model)
+    for path in paths:
+        try:
+            arrays.append(preprocess(os.path.join(root, path))[0])
+            rows.append({"path": path})
+        except (ValueError, OSError) as e:
+            rows.append({"path": path, "error": str(e)})
+    
+    if arrays:
+        predictions = iter(_worker_model.predict_batch(np.stack(arrays)))
+        for row in rows:
+            if "error" in row:
+                continue
+            probs = next(predictions)
+            predicted_index = int(np.argmax(probs))
+            row["category"] = CATEGORIES[predicted_index]
+            row["confidence"] = float(probs[predicted_index] * 100)
+            row.update((category, float(p)) for category, p in zip(CATEGORIES, probs))
+    return rows
+
+def _classify_chunk_star(args):
+    return _classify_chunk(*args)
+
+def find_images(root):
+    """
+    Relative paths of all images below root, in a stable order
+    """
+    paths = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.relpath(os.path.join(directory, name), root))
+    return paths
+
+def _truncate_partial_line(path):
+    """
+    Drop a trailing line that was cut off by an interrupted write
+    """
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+class JsonlWriter:
+    """One JSON object per line"""
+    def __init__(self, path):
+        self.path = path
+    
+    def done_paths(self):
+        if not os.path.exists(self.path):
+            return set()
+        _truncate_partial_line(self.path)
+        with open(self.path) as f:
+            return {json.loads(line)["path"] for line in f if line.strip()}
+    
+    def open(self):
+        self._file = open(self.path, 'a')
+    
+    def write(self, rows):
+        self._file.writelines(json.dumps(row) + "\n" for row in rows)
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+
+class CsvWriter:
+    """CSV with one column per category probability"""
+    def __init__(self, path):
+        self.path = path
+    
+    def done_paths(self):
+        if not os.path.exists(self.path):
+            return set()
+        _truncate_partial_line(self.path)
+        with open(self.path, newline='') as f:
+            return {row["path"] for row in csv.DictReader(f)}
+    
+    def open(self):
+        write_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        self._file = open(self.path, 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if write_header:
+            self._writer.writeheader()
+    
+    def write(self, rows):
+        self._writer.writerows(rows)
+        self._file.flush()
+    
+    def close(self):
+        self._file.close()
+
+class ParquetWriter:
+    """
+    Directory of Parquet part files, each written atomically, so a crash
+    never leaves a half-written file behind
+    
+    A part is written once rows_per_part rows are pending or flush_interval
+    seconds have passed since the last one, so an interrupt loses at most
+    that much finished work.
+    """
+    def __init__(self, path, rows_per_part=10000, flush_interval=10.0):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.rows_per_part = rows_per_part
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._last_flush = time.monotonic()
+    
+    def _parts(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+    
+    def done_paths(self):
+        done = set()
+        for part in self._parts():
+            done.update(self._pq.read_table(part, columns=["path"]).column("path").to_pylist())
+        return done
+    
+    def open(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._next_part = len(self._parts())
+    
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        columns = {field: [row.get(field) for row in self._pending] for field in FIELDS}
+        part = os.path.join(self.path, f"part-{self._next_part:05d}.parquet")
+        self._pq.write_table(self._pa.table(columns), part + ".tmp")
+        os.replace(part + ".tmp", part)
+        self._next_part += 1
+        self._pending = []
+    
+    def write(self, rows):
+        self._pending.extend(rows)
+        if (len(self._pending) >= self.rows_per_part
+                or time.monotonic() - self._last_flush >= self.flush_interval):
+            self._flush()
+    
+    def close(self):
+        self._flush()
+
+WRITERS = {".jsonl": JsonlWriter, ".csv": CsvWriter, ".parquet": ParquetWriter}
+
+def classify_directory(root, output, workers=None, chunk_size=32, overwrite=False):
+    """
+    Classify every image below root and stream the results to output
+    
+    Args:
+        root: Directory to scan
+        output: Output path; the extension (.jsonl, .csv, .parquet) picks the format
+        workers: Worker processes, defaults to the CPU count
+        chunk_size: Images decoded and classified together in one task
+        overwrite: Start from scratch instead of resuming
+    
+    Returns:
+        Dictionary with counts and the sustained images/second
+    """
+    extension = os.path.splitext(output)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError(f"Unsupported output format: {extension} (use {', '.join(WRITERS)})")
+    writer = WRITERS[extension](output)
+    
+    if overwrite and os.path.exists(output):
+        if os.path.isdir(output):
+            for part in glob.glob(os.path.join(output, "part-*.parquet")):
+                os.remove(part)
+        else:
+            os.remove(output)
+    
+    all_paths = find_images(root)
+    done = writer.done_paths()
+    todo = [path for path in all_paths if path not in done]
+    skipped = len(all_paths) - len(todo)
+    print(f"{len(all_paths)} images found, {skipped} already done, {len(todo)} to classify")
+    
+    chunks = [todo[i:i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    processed = 0
+    errors = 0
+    start = time.perf_counter()
+    last_report = start
+    
+    writer.open()
+    try:
+        with multiprocessing.get_context('spawn').Pool(workers or os.cpu_count(),
+                                                       initializer=_init_worker) as pool:
+            results = pool.imap_unordered(_classify_chunk_star, ((root, chunk) for chunk in chunks))
+            for rows in results:
+                writer.write(rows)
+                processed += len(rows)
+                errors += sum(1 for row in rows if "error" in row)
+                now = time.perf_counter()
+                if now - last_report >= 10:
+                    last_report = now
+                    print(f"  {processed}/{len(todo)} images, {processed / (now - start):.1f} images/s")
+    finally:
+        writer.close()
+    
+    elapsed = time.perf_counter() - start
+    summary = {
+        "found": len(all_paths),
+        "skipped": skipped,
+        "processed": processed,
+        "errors": errors,
+        "seconds": elapsed,
+        "images_per_second": processed / elapsed if elapsed > 0 else 0.0,
+    }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify every image in a directory tree")
+    parser.add_argument("root", help="Directory to scan")
+    parser.add_argument("--output", required=True,
+                        help="Results file: .jsonl, .csv or .parquet (a directory of parts)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Images per worker task")
+    parser.add_argument("--overwrite", action="store_true", help="Start over instead of resuming")
+    args = parser.parse_args()
+    
+    summary = classify_directory(args.root, args.output, args.workers, args.chunk_size, args.overwrite)
+    print(f"Classified {summary['processed']} images ({summary['errors']} errors) in "
+          f"{summary['seconds']:.1f}s: {summary['images_per_second']:.1f} images/s sustained")
+
+if __name__ == "__main__":
+    main()
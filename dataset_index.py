@@ -0,0 +1,212 @@
+"""
+Persistent manifest of a training dataset
+
+    python dataset_index.py dataset            # build or refresh dataset/index.sqlite
+    python dataset_index.py dataset --workers 8
+
+The index records every image in dataset/<split>/<category>/ with its size,
+modification time, content hash and whether it decodes. A refresh only
+hashes and decodes files that are new or whose size or mtime changed, so
+rescanning a large, mostly unchanged dataset costs little more than a
+directory walk, and WasteDataset can load a split from the index instead of
+listing directories.
+"""
+import argparse
+import hashlib
+import multiprocessing
+import os
+import sqlite3
+import time
+
+from model import IMAGE_EXTENSIONS
+
+INDEX_FILE = "index.sqlite"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    split TEXT NOT NULL,
+    category TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT,
+    decodable INTEGER NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS files_split ON files (split, path);
+CREATE INDEX IF NOT EXISTS files_hash ON files (hash);
+"""
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+def _inspect_chunk(root, entries):
+    """
+    Hash and test-decode a chunk of files in a worker
+    
+    Returns:
+        List of (path, hash, decodable, error) tuples
+    """
+    from model import preprocess_image
+    
+    results = []
+    for path in entries:
+        try:
+            with open(os.path.join(root, path), 'rb') as f:
+                data = f.read()
+        except OSError as e:
+            results.append((path, None, 0, str(e)))
+            continue
+        digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+        try:
+            # Same decode path (and pixel cap) as serving, so what trains also classifies
+            preprocess_image(data, as_uint8=True)
+            results.append((path, digest, 1, None))
+        except (ValueError, OSError) as e:
+            results.append((path, digest, 0, str(e)))
+    return results
+
+def _inspect_chunk_star(args):
+    return _inspect_chunk(*args)
+
+def scan_files(root):
+    """
+    Stat every image in root/<split>/<category>/
+    
+    Returns:
+        Dictionary mapping relative path to (split, category, size, mtime_ns)
+    """
+    files = {}
+    for split in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if not split.is_dir():
+            continue
+        for category in sorted(os.scandir(split.path), key=lambda entry: entry.name):
+            if not category.is_dir():
+                continue
+            for entry in os.scandir(category.path):
+                if entry.is_file() and entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    stat = entry.stat()
+                    path = f"{split.name}/{category.name}/{entry.name}"
+                    files[path] = (split.name, category.name, stat.st_size, stat.st_mtime_ns)
+    return files
+
+class DatasetIndex:
+    """
+    SQLite manifest of the images below a dataset root
+    
+    Args:
+        root: Dataset directory containing one subdirectory per split
+        index_path: Database file, defaults to root/index.sqlite
+    """
+    def __init__(self, root, index_path=None):
+        self.root = root
+        self.index_path = index_path or os.path.join(root, INDEX_FILE)
+        self._conn = sqlite3.connect(self.index_path)
+        self._conn.executescript(_SCHEMA)
+    
+    def refresh(self, workers=None, chunk_size=64):
+        """
+        Bring the index up to date with the files on disk
+        
+        Only new files and files whose size or mtime changed are hashed and
+        decoded, in worker processes; removed files are dropped.
+        
+        Returns:
+            Dictionary with file counts and the elapsed seconds
+        """
+        start = time.perf_counter()
+        on_disk = scan_files(self.root)
+        known = {path: (size, mtime_ns) for path, size, mtime_ns
+                 in self._conn.execute("SELECT path, size, mtime_ns FROM files")}
+        
+        changed = [path for path, (_, _, size, mtime_ns) in on_disk.items()
+                   if known.get(path) != (size, mtime_ns)]
+        removed = [path for path in known if path not in on_disk]
+        
+        chunks = [changed[i:i + chunk_size] for i in range(0, len(changed), chunk_size)]
+        if chunks:
+            processes = min(workers or os.cpu_count(), len(chunks))
+            with multiprocessing.get_context('spawn').Pool(processes, initializer=_init_worker) as pool:
+                for results in pool.imap_unordered(_inspect_chunk_star,
+                                                   ((self.root, chunk) for chunk in chunks)):
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        [(path, *on_disk[path], digest, decodable, error)
+                         for path, digest, decodable, error in results])
+        self._conn.executemany("DELETE FROM files WHERE path = ?", [(path,) for path in removed])
+        self._conn.commit()
+        
+        return {
+            "files": len(on_disk),
+            "added": sum(1 for path in changed if path not in known),
+            "updated": sum(1 for path in changed if path in known),
+            "removed": len(removed),
+            "undecodable": self._conn.execute(
+                "SELECT COUNT(*) FROM files WHERE decodable = 0").fetchone()[0],
+            "seconds": time.perf_counter() - start,
+        }
+    
+    def samples(self, split):
+        """
+        Decodable images of a split as (relative path, category) pairs, sorted by path
+        """
+        return self._conn.execute(
+            "SELECT path, category FROM files WHERE split = ? AND decodable = 1 ORDER BY path",
+            (split,)).fetchall()
+    
+    def undecodable(self):
+        """
+        (relative path, error) pairs of files that failed to decode
+        """
+        return self._conn.execute(
+            "SELECT path, error FROM files WHERE decodable = 0 ORDER BY path").fetchall()
+    
+    def duplicates(self):
+        """
+        Groups of byte-identical files, e.g. the same image in two classes or in train and val
+        
+        Returns:
+            List of path lists, one per content hash seen more than once
+        """
+        rows = self._conn.execute(
+            "SELECT hash, path FROM files WHERE hash IN "
+            "(SELECT hash FROM files WHERE hash IS NOT NULL GROUP BY hash HAVING COUNT(*) > 1) "
+            "ORDER BY hash, path").fetchall()
+        groups = {}
+        for digest, path in rows:
+            groups.setdefault(digest, []).append(path)
+        return list(groups.values())
+    
+    def close(self):
+        self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def report(index, stats):
+    """Print refresh counts, undecodable files and duplicate groups"""
+    print(f"{stats['files']} files indexed in {stats['seconds']:.2f}s: {stats['added']} added, "
+          f"{stats['updated']} updated, {stats['removed']} removed")
+    for path, error in index.undecodable():
+        print(f"  undecodable: {path} ({error})")
+    duplicates = index.duplicates()
+    if duplicates:
+        print(f"{len(duplicates)} groups of duplicate files:")
+        for paths in duplicates:
+            print("  " + ", ".join(paths))
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or refresh the manifest of a training dataset")
+    parser.add_argument("root", nargs="?", default="dataset", help="Dataset directory (default: dataset)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+    
+    with DatasetIndex(args.root) as index:
+        report(index, index.refresh(workers=args.workers))
+
+if __name__ == "__main__":
+    main()
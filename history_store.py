@@ -0,0 +1,194 @@
+"""
+SQLite store for the classification history
+
+Enabled by pointing RECYCLEAI_HISTORY_DB at a database file; utils then
+reads and writes history here instead of the JSONL log. The database runs
+in WAL mode, so the dashboard's reads never block the app's inserts.
+Timestamps are stored as epoch seconds and indexed together with the
+category, and a trigger keeps per-day, per-category totals up to date on
+every insert, so the dashboard aggregations read a few rows per day of
+history rather than every classification.
+"""
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS classifications (
+    id INTEGER PRIMARY KEY,
+    ts INTEGER NOT NULL,
+    category TEXT NOT NULL,
+    confidence REAL NOT NULL,
+    image BLOB
+);
+CREATE INDEX IF NOT EXISTS classifications_ts ON classifications (ts);
+CREATE INDEX IF NOT EXISTS classifications_category ON classifications (category, ts);
+
+CREATE TABLE IF NOT EXISTS daily_totals (
+    day TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (day, category)
+) WITHOUT ROWID;
+
+CREATE TRIGGER IF NOT EXISTS classifications_rollup AFTER INSERT ON classifications
+BEGIN
+    INSERT INTO daily_totals (day, category, count, confidence_sum)
+    VALUES (date(NEW.ts, 'unixepoch', 'localtime'), NEW.category, 1, NEW.confidence)
+    ON CONFLICT (day, category) DO UPDATE SET
+        count = count + 1,
+        confidence_sum = confidence_sum + excluded.confidence_sum;
+END;
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_INSERT = "INSERT INTO classifications (ts, category, confidence, image) VALUES (?, ?, ?, ?)"
+
+def to_epoch(timestamp):
+    """Local "%Y-%m-%d %H:%M:%S" timestamp, as written by app.py, to epoch seconds"""
+    return int(time.mktime(time.strptime(timestamp, TIMESTAMP_FORMAT)))
+
+def from_epoch(ts):
+    return datetime.fromtimestamp(ts).strftime(TIMESTAMP_FORMAT)
+
+class HistoryStore:
+    """
+    Classification history in SQLite
+    
+    One connection per process is shared by all threads (Streamlit runs
+    each session in a thread) and serialised with a lock; use
+    HistoryStore.for_path to get it.
+    
+    Args:
+        path: Database file, created on first use
+    """
+    _instances = {}
+    _instances_lock = threading.Lock()
+    
+    def __init__(self, path):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # In WAL mode NORMAL only risks the latest commits on power loss, never corruption
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+    
+    @classmethod
+    def for_path(cls, path):
+        """The process-wide store for path"""
+        with cls._instances_lock:
+            store = cls._instances.get(path)
+            if store is None:
+                store = cls._instances[path] = cls(path)
+            return store
+    
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COALESCE(SUM(count), 0) FROM daily_totals").fetchone()[0]
+    
+    def append(self, entry):
+        self.extend([entry])
+    
+    @staticmethod
+    def _rows(entries):
+        return [
+            (to_epoch(entry["timestamp"]), entry["category"], float(entry["confidence"]), entry.get("image"))
+            for entry in entries
+        ]
+    
+    def extend(self, entries):
+        """Insert entries in one transaction"""
+        rows = self._rows(entries)
+        with self._lock, self._conn:
+            self._conn.executemany(_INSERT, rows)
+    
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else default
+    
+    def set_meta(self, key, value):
+        with self._lock, self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+    
+    def import_chunk(self, entries, start, end, progress_key):
+        """
+        Insert entries read from bytes [start, end) of a log and record end
+        as the progress under progress_key, in one transaction
+        
+        Returns:
+            False, inserting nothing, if the recorded progress is not start,
+            i.e. another process has already imported this chunk
+        """
+        rows = self._rows(entries)
+        with self._lock, self._conn:
+            # Take the write lock before reading the progress, so two
+            # processes cannot both import the same chunk
+            self._conn.execute("BEGIN IMMEDIATE")
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (progress_key,)).fetchone()
+            if int(row[0] if row is not None else 0) != start:
+                return False
+            self._conn.executemany(_INSERT, rows)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (progress_key, str(end)))
+            return True
+    
+    def recent(self, limit=None):
+        """
+        Latest entries, oldest first, in the format save_classification_history takes
+        """
+        query = "SELECT ts, category, confidence, image FROM classifications ORDER BY id DESC"
+        params = ()
+        if limit is not None:
+            query += " LIMIT ?"
+            params = (limit,)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        history = []
+        for ts, category, confidence, image in reversed(rows):
+            entry = {"timestamp": from_epoch(ts), "category": category, "confidence": confidence}
+            if image is not None:
+                entry["image"] = image
+            history.append(entry)
+        return history
+    
+    def category_stats(self):
+        """
+        (category, count, average confidence) rows, by category
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT category, SUM(count), SUM(confidence_sum) / SUM(count) FROM daily_totals "
+                "GROUP BY category ORDER BY category").fetchall()
+    
+    def daily_counts(self):
+        """
+        (day as "YYYY-MM-DD", category, count) rows, by day and category
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT day, category, count FROM daily_totals ORDER BY day, category").fetchall()
+    
+    def overview(self, since):
+        """
+        Total count, average confidence and number of entries after since (epoch seconds)
+        """
+        with self._lock:
+            total, confidence_sum = self._conn.execute(
+                "SELECT COALESCE(SUM(count), 0), COALESCE(SUM(confidence_sum), 0) FROM daily_totals").fetchone()
+            recent = self._conn.execute(
+                "SELECT COUNT(*) FROM classifications WHERE ts > ?", (since,)).fetchone()[0]
+        return {
+            "total": total,
+            "avg_confidence": confidence_sum / total if total else 0.0,
+            "recent_24h": recent,
+        }
@@ -0,0 +1,130 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from model import WasteClassifier
+
+# Classifier owned by each worker process, created by _init_worker
+_worker_model = None
+
+def _init_worker(base_seed, opencv_threads):
+    """
+    Set up one worker process: pin OpenCV threads and build a classifier
+    with its own random generator
+    """
+    global _worker_model
+    import cv2
+    cv2.setNumThreads(opencv_threads)
+    
+    # Mixing in the pid gives every worker an independent stream
+    seed = np.random.SeedSequence([base_seed, os.getpid()])
+    _worker_model = WasteClassifier(seed=seed)
+
+def _predict_shared(shm_name, shape, dtype, start, stop):
+    """
+    Classify images [start, stop) of a batch that lives in shared memory
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        batch = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        predictions = _worker_model.predict_batch(batch[start:stop])
+        # The view has to go before the block can be closed
+        del batch
+        return predictions
+    finally:
+        shm.close()
+
+class InferenceEngine:
+    """
+    Runs WasteClassifier in a pool of worker processes
+    
+    Batches are copied once into a shared memory block and each worker
+    classifies a slice of it, so only the small probability matrices are
+    pickled. The engine exposes the same predict / predict_batch /
+    categories contract as WasteClassifier, so predict_waste_class and
+    predict_waste_class_batch work with it unchanged.
+    
+    Args:
+        num_workers: Number of worker processes, defaults to the CPU count
+        seed: Base seed for the per-worker random generators
+        opencv_threads: OpenCV thread count inside each worker; 1 avoids
+            oversubscribing cores when every worker is busy
+        chunk_size: Images per task; defaults to splitting each batch evenly
+            across the workers
+    """
+    def __init__(self, num_workers=None, seed=None, opencv_threads=1, chunk_size=None):
+        self.num_workers = num_workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        
+        reference = WasteClassifier()
+        self.categories = reference.categories
+        self.version = reference.version
+        
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        
+        # spawn keeps workers independent of whatever threads the parent
+        # (e.g. the Streamlit server) is running
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(seed, opencv_threads),
+        )
+    
+    def predict(self, image_array):
+        """
+        Predict a single image, with or without batch dimension
+        """
+        if len(image_array.shape) == 3:
+            image_array = image_array[np.newaxis]
+        return self.predict_batch(image_array[:1])[0]
+    
+    def predict_batch(self, image_batch):
+        """
+        Predict a batch of images across the worker pool
+        
+        Args:
+            image_batch: Array of shape (N, 224, 224, 3), floats in [0, 1]
+                or uint8 pixels
+        
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        image_batch = np.asarray(image_batch)
+        n = len(image_batch)
+        if n == 0:
+            return np.zeros((0, len(self.categories)))
+        
+        chunk_size = self.chunk_size or -(-n // self.num_workers)
+        
+        shm = shared_memory.SharedMemory(create=True, size=image_batch.nbytes)
+        try:
+            shared = np.ndarray(image_batch.shape, dtype=image_batch.dtype, buffer=shm.buf)
+            shared[...] = image_batch
+            del shared
+            
+            futures = [
+                self._executor.submit(_predict_shared, shm.name, image_batch.shape,
+                                      image_batch.dtype.str, start, min(start + chunk_size, n))
+                for start in range(0, n, chunk_size)
+            ]
+            return np.concatenate([future.result() for future in futures])
+        finally:
+            shm.close()
+            shm.unlink()
+    
+    def close(self):
+        """
+        Shut down the worker processes
+        """
+        self._executor.shutdown()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,259 @@
+"""
+Multinomial linear model over the handcrafted image features
+
+    python linear_model.py dataset/train --val dataset/val --output waste_linear.npz
+
+Fitting extracts the WasteClassifier features (see features.FEATURE_NAMES)
+from root/<category>/ images in worker processes and fits a softmax
+regression to them. The result is a few kilobytes of NumPy arrays;
+serving it needs neither PyTorch nor the rule chain, only one matrix
+multiply per batch:
+
+    RECYCLEAI_MODEL_BACKEND=linear python serve.py
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+import metrics
+from features import FEATURE_NAMES, FeatureVector, extract_features
+from model import IMAGE_EXTENSIONS, WasteClassifier, file_digest, preprocess_image
+
+CATEGORIES = WasteClassifier().categories
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    np.exp(logits, out=logits)
+    logits /= logits.sum(axis=1, keepdims=True)
+    return logits
+
+class LinearWasteClassifier:
+    """
+    Serves a model fitted by fit_linear_model with the WasteClassifier contract
+    
+    Feature standardisation is folded into the weights at load time, so a
+    batch costs the feature extraction plus a single (N, F) x (F, 6) product.
+    
+    Args:
+        weights_path: .npz file written by save_linear_model
+    """
+    def __init__(self, weights_path='waste_linear.npz'):
+        with np.load(weights_path) as data:
+            self.categories = data['categories'].tolist()
+            if data['feature_names'].tolist() != FEATURE_NAMES:
+                raise ValueError(f"{weights_path} was fitted on different features; refit it")
+            scale = data['scale']
+            self.weights = data['weights'] / scale[:, np.newaxis]
+            self.bias = data['bias'] - (data['mean'] / scale) @ data['weights']
+        self.version = f"linear-{file_digest(weights_path)}"
+    
+    def predict(self, image_array):
+        """
+        Class probabilities for a single image
+        """
+        if len(image_array.shape) == 4:
+            image_array = image_array[0]
+        return self.predict_batch(image_array[np.newaxis])[0]
+    
+    def predict_batch(self, image_batch):
+        """
+        Predict a whole stack of images at once
+        
+        Args:
+            image_batch: Array of shape (N, 224, 224, 3), floats in [0, 1]
+                or uint8 pixels
+        
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        with metrics.stage('features'):
+            features = extract_features(image_batch)
+        with metrics.stage('linear'):
+            return self.predict_features(features)
+    
+    def predict_features(self, features):
+        """
+        Class probabilities for precomputed features
+        
+        Args:
+            features: FeatureVector as returned by features.extract_features
+        
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        return _softmax(features.as_matrix() @ self.weights + self.bias)
+
+def _init_worker():
+    import cv2
+    cv2.setNumThreads(1)
+
+def _feature_chunk(paths):
+    """
+    Decode a chunk of images and extract their features in a worker
+    
+    Returns:
+        (feature matrix, mask of the paths that decoded)
+    """
+    arrays = []
+    ok = np.zeros(len(paths), dtype=bool)
+    for i, path in enumerate(paths):
+        try:
+            arrays.append(preprocess_image(path, as_uint8=True)[0])
+            ok[i] = True
+        except (ValueError, OSError):
+            pass
+    if not arrays:
+        return np.empty((0, len(FEATURE_NAMES))), ok
+    return extract_features(np.stack(arrays)).as_matrix(), ok
+
+def labeled_images(root):
+    """
+    Paths and label indices of the images in root/<category>/, in a stable order
+    """
+    paths = []
+    labels = []
+    for label, category in enumerate(CATEGORIES):
+        directory = os.path.join(root, category)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(directory, name))
+                labels.append(label)
+    return paths, np.array(labels, dtype=np.int64)
+
+def extract_directory_features(root, workers=None, chunk_size=64):
+    """
+    Features of every decodable image in root/<category>/
+    
+    Returns:
+        (features of shape (N, len(FEATURE_NAMES)), labels of shape (N,));
+        undecodable files are skipped
+    """
+    paths, labels = labeled_images(root)
+    chunks = [paths[i:i + chunk_size] for i in range(0, len(paths), chunk_size)]
+    if not chunks:
+        raise ValueError(f"No labeled images found in {root}")
+    
+    processes = min(workers or os.cpu_count(), len(chunks))
+    with multiprocessing.get_context('spawn').Pool(processes, initializer=_init_worker) as pool:
+        results = pool.map(_feature_chunk, chunks)
+    
+    features = np.concatenate([matrix for matrix, _ in results])
+    ok = np.concatenate([mask for _, mask in results])
+    return features, labels[ok]
+
+def fit_linear_model(features, labels, num_classes=len(CATEGORIES), l2=1e-3, max_iterations=100, tolerance=1e-8):
+    """
+    Fit a multinomial logistic regression with Newton's method
+    
+    Features are standardised first. With only len(FEATURE_NAMES) + 1
+    inputs the Hessian is tiny, so Newton converges in a handful of
+    iterations, each a few passes over the feature matrix.
+    
+    Args:
+        features: Array of shape (N, F)
+        labels: Integer class labels of shape (N,)
+        l2: L2 penalty on the weights (not the bias)
+    
+    Returns:
+        Dictionary of the arrays save_linear_model stores
+    """
+    mean = features.mean(axis=0)
+    scale = features.std(axis=0)
+    scale[scale == 0] = 1.0
+    x = np.column_stack([(features - mean) / scale, np.ones(len(features))])
+    n, d = x.shape
+    targets = np.eye(num_classes)[labels]
+    penalty = np.full((d, num_classes), l2)
+    penalty[-1] = 0.0
+    
+    def loss(w):
+        logits = x @ w
+        logits -= logits.max(axis=1, keepdims=True)
+        log_probs = logits - np.log(np.exp(logits).sum(axis=1, keepdims=True))
+        return -np.sum(targets * log_probs) / n + 0.5 * np.sum(penalty * w * w)
+    
+    w = np.zeros((d, num_classes))
+    current = loss(w)
+    for _ in range(max_iterations):
+        probs = _softmax(x @ w)
+        gradient = x.T @ (probs - targets) / n + penalty * w
+        
+        # Hessian blocks H[k, l] = X^T diag(p_k (delta_kl - p_l)) X / n
+        hessian = np.empty((num_classes, d, num_classes, d))
+        for k in range(num_classes):
+            for l in range(k, num_classes):
+                weight = probs[:, k] * ((k == l) - probs[:, l])
+                block = (x * weight[:, np.newaxis]).T @ x / n
+                hessian[k, :, l] = block
+                hessian[l, :, k] = block.T
+        hessian = hessian.reshape(num_classes * d, num_classes * d)
+        hessian += np.diag(penalty.T.ravel()) + 1e-9 * np.eye(num_classes * d)
+        step = np.linalg.lstsq(hessian, gradient.T.ravel(), rcond=None)[0].reshape(num_classes, d).T
+        
+        # Backtracking keeps Newton stable on (nearly) separable data
+        t = 1.0
+        while t > 1e-4:
+            candidate = w - t * step
+            candidate_loss = loss(candidate)
+            if candidate_loss <= current:
+                break
+            t /= 2
+        else:
+            break
+        w, previous, current = candidate, current, candidate_loss
+        if previous - current < tolerance:
+            break
+    
+    return {
+        'weights': w[:-1],
+        'bias': w[-1],
+        'mean': mean,
+        'scale': scale,
+        'categories': np.array(CATEGORIES[:num_classes]),
+        'feature_names': np.array(FEATURE_NAMES),
+    }
+
+def save_linear_model(params, path):
+    """Write fitted parameters as an .npz file, atomically"""
+    tmp_path = path + '.tmp.npz'
+    np.savez(tmp_path, **params)
+    os.replace(tmp_path, path)
+
+def accuracy(probs, labels):
+    """Top-1 accuracy in percent"""
+    return 100.0 * float(np.mean(np.argmax(probs, axis=1) == labels)) if len(labels) else 0.0
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the linear feature model on a labeled image directory")
+    parser.add_argument("root", help="Training images in root/<category>/")
+    parser.add_argument("--val", default=None, help="Validation images in the same layout")
+    parser.add_argument("--output", default="waste_linear.npz")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--l2", type=float, default=1e-3, help="L2 penalty on the weights")
+    args = parser.parse_args()
+    
+    start = time.perf_counter()
+    features, labels = extract_directory_features(args.root, workers=args.workers)
+    print(f"Extracted features of {len(labels)} images in {time.perf_counter() - start:.1f}s")
+    
+    params = fit_linear_model(features, labels, l2=args.l2)
+    save_linear_model(params, args.output)
+    model = LinearWasteClassifier(args.output)
+    print(f"Saved {args.output} ({os.path.getsize(args.output)} bytes)")
+    
+    splits = [("train", features, labels)]
+    if args.val:
+        splits.append(("val", *extract_directory_features(args.val, workers=args.workers)))
+    for name, split_features, split_labels in splits:
+        vector = FeatureVector.from_matrix(split_features)
+        linear = accuracy(model.predict_features(vector), split_labels)
+        rules = accuracy(WasteClassifier(seed=0).predict_features(vector), split_labels)
+        print(f"{name}: linear {linear:.2f}%, rules {rules:.2f}% top-1")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Low-overhead stage timers and counters for the classify path
+
+Metrics are off unless RECYCLEAI_METRICS=1 is set (or enable() is called);
+while off, stage() hands back one shared no-op context manager and
+increment()/observe() return after a single flag check.
+
+Collected metrics are exposed in Prometheus text format via
+render_prometheus(), the HTTP service's /metrics endpoint, or a standalone
+exporter started with RECYCLEAI_METRICS_PORT (see serve_from_env).
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PREFIX = "recycleai"
+
+# Upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+ENABLED = os.environ.get("RECYCLEAI_METRICS", "0").lower() not in ("", "0", "false", "no")
+
+_NULL_STAGE = nullcontext()
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+_server = None
+
+class Histogram:
+    """
+    Cumulative-bucket latency histogram in the Prometheus style
+    """
+    __slots__ = ('counts', 'sum', 'count')
+    
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def quantile(self, q):
+        """
+        Estimate a quantile by interpolating inside the matching bucket
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                lower = BUCKETS[index - 1] if index > 0 else 0.0
+                upper = BUCKETS[index] if index < len(BUCKETS) else BUCKETS[-1]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return BUCKETS[-1]
+
+class _StageTimer:
+    __slots__ = ('name', 'start')
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc_info):
+        observe(self.name, time.perf_counter() - self.start)
+        return False
+
+def enable(enabled=True):
+    """Turn collection on or off at runtime"""
+    global ENABLED
+    ENABLED = enabled
+
+def stage(name):
+    """
+    Context manager that records the duration of a pipeline stage
+    
+    Usage:
+        with metrics.stage('decode'):
+            ...
+    """
+    if not ENABLED:
+        return _NULL_STAGE
+    return _StageTimer(name)
+
+def observe(stage_name, seconds):
+    """Record an already measured stage duration"""
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(stage_name)
+        if histogram is None:
+            histogram = _histograms[stage_name] = Histogram()
+        histogram.observe(seconds)
+
+def increment(name, amount=1, **labels):
+    """
+    Increment a counter, e.g. increment('classifications', category='glass')
+    """
+    if not ENABLED:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def reset():
+    """Drop everything collected so far"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def snapshot():
+    """
+    Summary of the collected metrics for display
+    
+    Returns:
+        Dictionary with per-stage latency summaries (milliseconds) and
+        counter values keyed by name and label tuple
+    """
+    with _lock:
+        stages = {
+            name: {
+                "count": histogram.count,
+                "mean_ms": histogram.sum / histogram.count * 1000 if histogram.count else 0.0,
+                "p50_ms": histogram.quantile(0.5) * 1000,
+                "p95_ms": histogram.quantile(0.95) * 1000,
+                "p99_ms": histogram.quantile(0.99) * 1000,
+            }
+            for name, histogram in _histograms.items()
+        }
+        counters = dict(_counters)
+    return {"stages": stages, "counters": counters}
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+def render_prometheus():
+    """
+    Render all metrics in the Prometheus text exposition format
+    """
+    lines = []
+    with _lock:
+        if _histograms:
+            name = f"{PREFIX}_stage_seconds"
+            lines.append(f"# HELP {name} Latency of classify pipeline stages")
+            lines.append(f"# TYPE {name} histogram")
+            for stage_name, histogram in sorted(_histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS + (float("inf"),), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{name}_bucket{{stage="{stage_name}",le="{le}"}} {cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage_name}"}} {histogram.sum}')
+                lines.append(f'{name}_count{{stage="{stage_name}"}} {histogram.count}')
+        
+        for counter_name in sorted({name for name, _ in _counters}):
+            name = f"{PREFIX}_{counter_name}_total"
+            lines.append(f"# TYPE {name} counter")
+            for (key, labels), value in sorted(_counters.items()):
+                if key == counter_name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        pass
+
+def start_http_server(port, host="0.0.0.0"):
+    """
+    Serve /metrics on a background thread; later calls are no-ops
+    """
+    global _server
+    with _lock:
+        if _server is not None:
+            return _server
+        _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=_server.serve_forever, name="metrics-exporter", daemon=True).start()
+    return _server
+
+def serve_from_env():
+    """
+    Start the exporter if RECYCLEAI_METRICS_PORT is set (implies enabling metrics)
+    """
+    port = os.environ.get("RECYCLEAI_METRICS_PORT")
+    if port:
+        enable()
+        start_http_server(int(port))
@@ -1,14 +1,37 @@
 import numpy as np
 from PIL import Image
+import functools
+import hashlib
 import io
-import cv2
+import time
+
+import metrics
+from features import extract_features, window_features
+
+# Bump whenever the rules or features change so cached predictions are invalidated
+MODEL_VERSION = 'heuristic-1'
+
+# Width and height the classifier expects
+INPUT_SIZE = (224, 224)
+
+# File extensions treated as images when scanning directories
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+# Hard cap on decoded pixels per upload (after JPEG draft scaling), ~150 MB as RGB
+MAX_DECODED_PIXELS = 50_000_000
 
 class WasteClassifier:
     """
     A classifier that uses image features for waste classification
+    
+    Args:
+        seed: Optional seed for a private random generator. Without it the
+            global np.random state is used, as before.
     """
-    def __init__(self):
+    def __init__(self, seed=None):
         self.categories = ['plastic', 'glass', 'metal', 'paper', 'organic', 'e-waste']
+        self.version = MODEL_VERSION
+        self.rng = np.random if seed is None else np.random.default_rng(seed)
     
     def predict(self, image_array):
         """
@@ -18,122 +41,233 @@ class WasteClassifier:
         if len(image_array.shape) == 4:
             image_array = image_array[0]
         
-        # Convert to OpenCV format for better feature extraction
-        img_cv = (image_array * 255).astype(np.uint8)
-        
-        # Calculate average color values per channel
-        avg_colors = np.mean(image_array, axis=(0, 1))
-        r, g, b = avg_colors
-        
-        # Calculate color variance (texture)
-        color_variance = np.var(image_array, axis=(0, 1))
-        texture_score = np.mean(color_variance)
-        
-        # Calculate brightness
-        brightness = np.mean(image_array)
-        
-        # Calculate color ratios
-        red_ratio = r / (r + g + b + 1e-6)
-        green_ratio = g / (r + g + b + 1e-6)
-        blue_ratio = b / (r + g + b + 1e-6)
-        
-        # Calculate edge detection for shape analysis
-        gray = cv2.cvtColor(img_cv, cv2.COLOR_RGB2GRAY)
-        edges = cv2.Canny(gray, 100, 200)
-        edge_density = np.mean(edges > 0)
-        
-        # Calculate color saturation
-        hsv = cv2.cvtColor(img_cv, cv2.COLOR_RGB2HSV)
-        saturation = np.mean(hsv[:, :, 1]) / 255.0
-        
-        # Initialize probabilities
-        probs = np.zeros(len(self.categories))
+        return self.predict_batch(image_array[np.newaxis])[0]
+    
+    def predict_batch(self, image_batch):
+        """
+        Predict a whole stack of images at once
         
-        # Plastic detection (shiny, smooth surface, often colorful)
-        if (saturation > 0.3 and  # Colorful
-            edge_density < 0.1 and  # Smooth surface
-            texture_score < 0.2 and  # Low texture
-            brightness > 0.5):  # Shiny
-            probs[0] += 0.9
+        Args:
+            image_batch: Array of shape (N, 224, 224, 3), either floats in
+                [0, 1] or uint8 pixels as returned by
+                preprocess_image(..., as_uint8=True)
         
-        # Glass detection (transparent, reflective, sharp edges)
-        elif (edge_density > 0.2 and  # Sharp edges
-              saturation < 0.2 and  # Low color saturation
-              brightness > 0.7 and  # Very bright
-              texture_score < 0.1):  # Very smooth
-            probs[1] += 0.9
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        with metrics.stage('features'):
+            features = extract_features(image_batch)
+        with metrics.stage('rules'):
+            return self.predict_features(features)
+    
+    def predict_features(self, features):
+        """
+        Apply the category rules to precomputed features
         
-        # Metal detection (reflective, high contrast, sharp edges)
-        elif (edge_density > 0.15 and  # Sharp edges
-              brightness > 0.6 and  # Bright
-              texture_score > 0.3 and  # High texture
-              saturation < 0.3):  # Low color saturation
-            probs[2] += 0.9
+        Args:
+            features: FeatureVector as returned by features.extract_features
         
-        # Paper detection (flat surface, high brightness, low texture)
-        elif (brightness > 0.8 and  # Very bright
-              texture_score < 0.1 and  # Very smooth
-              edge_density < 0.05 and  # Few edges
-              saturation < 0.2):  # Low color saturation
-            probs[3] += 0.9
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        brightness = features.brightness
+        texture_score = features.texture_score
+        green_ratio = features.green_ratio
+        saturation = features.saturation
+        edge_density = features.edge_density
+        n = len(features)
         
-        # Organic detection (textured, natural colors, irregular shape)
-        elif (texture_score > 0.4 and  # High texture
-              green_ratio > 0.3 and  # Natural colors
-              edge_density > 0.1 and  # Irregular shape
-              saturation > 0.2):  # Moderate color saturation
-            probs[4] += 0.9
+        rules = np.stack([
+            # Plastic detection (shiny, smooth surface, often colorful)
+            (saturation > 0.3) & (edge_density < 0.1) & (texture_score < 0.2) & (brightness > 0.5),
+            # Glass detection (transparent, reflective, sharp edges)
+            (edge_density > 0.2) & (saturation < 0.2) & (brightness > 0.7) & (texture_score < 0.1),
+            # Metal detection (reflective, high contrast, sharp edges)
+            (edge_density > 0.15) & (brightness > 0.6) & (texture_score > 0.3) & (saturation < 0.3),
+            # Paper detection (flat surface, high brightness, low texture)
+            (brightness > 0.8) & (texture_score < 0.1) & (edge_density < 0.05) & (saturation < 0.2),
+            # Organic detection (textured, natural colors, irregular shape)
+            (texture_score > 0.4) & (green_ratio > 0.3) & (edge_density > 0.1) & (saturation > 0.2),
+            # E-waste detection (complex shape, mixed materials, high contrast)
+            (edge_density > 0.25) & (texture_score > 0.3) & (brightness < 0.5) & (saturation > 0.2),
+        ], axis=1)
         
-        # E-waste detection (complex shape, mixed materials, high contrast)
-        elif (edge_density > 0.25 and  # Complex shape
-              texture_score > 0.3 and  # Mixed materials
-              brightness < 0.5 and  # Dark
-              saturation > 0.2):  # Some color
-            probs[5] += 0.9
+        # Rules are checked in order, so only the first one that fires counts
+        probs = np.zeros((n, len(self.categories)))
+        matched = np.flatnonzero(rules.any(axis=1))
+        probs[matched, np.argmax(rules[matched], axis=1)] += 0.9
         
         # Add some randomness to make it more realistic
-        probs += np.random.random(len(probs)) * 0.1
+        probs += self.rng.random(probs.shape) * 0.1
         
         # Normalize probabilities
-        probs = probs / np.sum(probs)
+        probs /= np.sum(probs, axis=1, keepdims=True)
         
         return probs
 
-def load_model():
+# Weights file each trained backend loads unless told otherwise
+DEFAULT_WEIGHTS = {'torch': 'waste_model.pth', 'linear': 'waste_linear.npz'}
+
+def file_digest(path):
+    """Short content hash of a weights file, used in the model version"""
+    digest = hashlib.blake2b(digest_size=8)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_model(num_workers=0, backend='heuristic', weights_path=None):
     """
     Load the waste classification model
+    
+    Args:
+        num_workers: Run the classifier in this many worker processes
+            (see inference_engine.InferenceEngine); 0 keeps it in-process
+        backend: 'heuristic' for the feature-based WasteClassifier,
+            'linear' for the feature model fitted by linear_model.py or
+            'torch' for the network trained by train.py
+        weights_path: Trained weights for the linear and torch backends,
+            defaults to DEFAULT_WEIGHTS[backend]
+    
+    Raises:
+        ValueError: For an unknown backend, or num_workers with a backend
+            other than 'heuristic'; the worker pool only runs
+            WasteClassifier, and PyTorch already spreads a batch over all
+            cores with its own threads
     """
+    if num_workers and backend != 'heuristic':
+        raise ValueError(f"num_workers is only supported by the heuristic backend, not {backend!r}")
+    if backend == 'torch':
+        # Imported lazily so the heuristic path never loads PyTorch
+        from torch_backend import TorchWasteClassifier
+        return TorchWasteClassifier(weights_path or DEFAULT_WEIGHTS['torch'])
+    if backend == 'linear':
+        from linear_model import LinearWasteClassifier
+        return LinearWasteClassifier(weights_path or DEFAULT_WEIGHTS['linear'])
+    if backend != 'heuristic':
+        raise ValueError(f"Unknown model backend: {backend}")
+    
+    if num_workers:
+        from inference_engine import InferenceEngine
+        return InferenceEngine(num_workers=num_workers)
+    
     model = WasteClassifier()
     return model
 
-def preprocess_image(image):
+def open_image(image):
+    """
+    Open an image without decoding its pixels yet
+    
+    Args:
+        image: PIL Image, file path, raw bytes or binary file object
+    
+    Returns:
+        PIL Image
+    
+    Raises:
+        ValueError: If PIL refuses the image as a decompression bomb
+    """
+    if isinstance(image, Image.Image):
+        return image
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        image = io.BytesIO(image)
+    try:
+        return Image.open(image)
+    except Image.DecompressionBombError as e:
+        # Far beyond MAX_DECODED_PIXELS; report it like the pixel cap so
+        # callers that skip oversized images handle both the same way
+        raise ValueError(f"Image too large to decode: {e}") from e
+
+def preprocess_image(image, as_uint8=False, timings=None, resize=None, draft_size=INPUT_SIZE):
     """
     Preprocess the image to match the model's expected input
     
+    JPEGs opened from a path, bytes or file are decoded directly at the
+    smallest DCT scale that still covers the model input, so large camera
+    photos never exist at full resolution.
+    Other formats are decoded in full, subject to MAX_DECODED_PIXELS.
+    
     Args:
-        image: PIL Image or file path
+        image: PIL Image, file path, raw bytes or binary file object
+        as_uint8: Keep the decoded uint8 pixels instead of building a
+            normalized float64 array. The classifier accepts both, and the
+            uint8 path avoids the float copy and the lossy round trip back
+            to uint8 for OpenCV.
+        timings: Optional dictionary that receives the 'decode' and
+            'resize' durations in seconds
+        resize: Optional callable taking the decoded RGB PIL image and
+            returning it at INPUT_SIZE; defaults to scaling the whole image
+            to INPUT_SIZE
+        draft_size: Smallest size JPEG draft decoding may reduce to; must
+            cover whatever resize needs
     
     Returns:
         Preprocessed image as numpy array
+    
+    Raises:
+        ValueError: If the image would decode to more than MAX_DECODED_PIXELS
     """
-    if isinstance(image, str):
-        image = Image.open(image)
+    start = time.perf_counter()
+    opened = not isinstance(image, Image.Image)
+    image = open_image(image)
+    
+    # Only has an effect on JPEGs that have not been loaded yet. A caller's
+    # PIL image is left as it is, since draft changes it in place.
+    if opened:
+        image.draft('RGB', draft_size)
+    
+    width, height = image.size
+    if width * height > MAX_DECODED_PIXELS:
+        raise ValueError(
+            f"Image too large to decode: {width}x{height} exceeds "
+            f"{MAX_DECODED_PIXELS} pixels"
+        )
     
     # Convert to RGB if needed
     if image.mode != 'RGB':
         image = image.convert('RGB')
+    image.load()
+    decoded = time.perf_counter()
     
     # Resize to expected dimensions
-    image = image.resize((224, 224))
+    image = resize(image) if resize is not None else image.resize(INPUT_SIZE)
     
-    # Convert to numpy array and normalize
-    img_array = np.array(image) / 255.0
+    if as_uint8:
+        # Single copy out of PIL; the batch axis is added as a view
+        img_array = np.asarray(image)[np.newaxis]
+    else:
+        # Convert to numpy array and normalize
+        img_array = np.array(image) / 255.0
+        
+        # Add batch dimension
+        img_array = np.expand_dims(img_array, axis=0)
     
-    # Add batch dimension
-    img_array = np.expand_dims(img_array, axis=0)
+    resized = time.perf_counter()
+    metrics.observe('decode', decoded - start)
+    metrics.observe('resize', resized - decoded)
+    if timings is not None:
+        timings['decode'] = decoded - start
+        timings['resize'] = resized - decoded
     
     return img_array
 
+def preprocessor(model):
+    """
+    The preprocessing a model's input needs
+    
+    Backends trained on a different view of the image (see
+    TorchWasteClassifier.preprocess) provide their own preprocess method;
+    everything else takes preprocess_image's uint8 output.
+    
+    Returns:
+        Callable mapping anything preprocess_image accepts to a
+        (1, 224, 224, 3) uint8 array
+    """
+    preprocess = getattr(model, 'preprocess', None)
+    if preprocess is not None:
+        return preprocess
+    return functools.partial(preprocess_image, as_uint8=True)
+
 def predict_waste_class(model, image_array):
     """
     Predict waste class from image array
@@ -148,6 +282,19 @@ def predict_waste_class(model, image_array):
     # Get model prediction
     predictions = model.predict(image_array)
     
+    return top_prediction(model, predictions)
+
+def top_prediction(model, predictions):
+    """
+    Turn a probability vector into a (predicted_class, confidence) tuple
+    
+    Args:
+        model: Model whose categories the probabilities refer to
+        predictions: Probability vector for one image
+    
+    Returns:
+        Tuple of (predicted_class, confidence)
+    """
     # Get the index of the highest probability
     predicted_index = np.argmax(predictions)
     
@@ -156,3 +303,65 @@ def predict_waste_class(model, image_array):
     confidence = predictions[predicted_index] * 100
     
     return predicted_class, confidence
+
+def predict_waste_class_batch(model, image_batch):
+    """
+    Predict waste classes for a batch of images in one call
+    
+    Args:
+        model: WasteClassifier instance
+        image_batch: Preprocessed images as numpy array of shape (N, 224, 224, 3)
+    
+    Returns:
+        List of (predicted_class, confidence) tuples, one per image
+    """
+    predictions = model.predict_batch(image_batch)
+    
+    predicted_indices = np.argmax(predictions, axis=1)
+    confidences = predictions[np.arange(len(predictions)), predicted_indices] * 100
+    
+    return [(model.categories[index], confidence)
+            for index, confidence in zip(predicted_indices, confidences)]
+
+def classify_regions(model, image, window=224, stride=None):
+    """
+    Classify every window of a sliding-window grid over a full image
+    
+    Useful for photos of a bin or conveyor segment holding several items.
+    Window features come from summed-area tables (see
+    features.window_features), so each window is O(1) after one pass over
+    the image.
+    
+    Args:
+        model: Classifier with predict_features, e.g. WasteClassifier
+        image: uint8 RGB array, or anything preprocess_image accepts
+        window: Window size in pixels of the full-resolution image
+        stride: Step between windows, defaults to half a window
+    
+    Returns:
+        List of dictionaries with the window 'box' as (x, y, width, height),
+        'category', 'confidence' and 'probabilities'
+    """
+    if not isinstance(image, np.ndarray):
+        image = open_image(image)
+        width, height = image.size
+        if width * height > MAX_DECODED_PIXELS:
+            raise ValueError(
+                f"Image too large to decode: {width}x{height} exceeds "
+                f"{MAX_DECODED_PIXELS} pixels"
+            )
+        image = np.asarray(image.convert('RGB'))
+    
+    boxes, features = window_features(image, window, stride or window // 2)
+    predictions = model.predict_features(features)
+    
+    regions = []
+    for box, probs in zip(boxes, predictions):
+        predicted_class, confidence = top_prediction(model, probs)
+        regions.append({
+            "box": tuple(int(v) for v in box),
+            "category": predicted_class,
+            "confidence": float(confidence),
+            "probabilities": probs,
+        })
+    return regions
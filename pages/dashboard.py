@@ -1,14 +1,10 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
-import io
-from datetime import datetime, timedelta
 import plotly.express as px
 import plotly.graph_objects as go
-from PIL import Image
 
-from utils import get_classification_history, get_stats_by_category, get_stats_over_time
+import metrics
+from utils import get_classification_history, get_overview_stats, get_stats_by_category, get_stats_over_time
 
 # Page configuration must be the first Streamlit command
 st.set_page_config(
@@ -46,6 +42,7 @@ st.markdown('<h1 style="color: #2E7D32; border-bottom: 2px solid #4CAF50; paddin
 
 # Get history data
 history = get_classification_history()
+overview = get_overview_stats()
 stats_by_category = get_stats_by_category()
 stats_over_time = get_stats_over_time()
 
@@ -61,7 +58,7 @@ if history:
     
     with col1:
         # Custom styled metric
-        total = len(history)
+        total = overview['total']
         st.markdown(f'''
         <div style="text-align: center; padding: 1rem; background-color: #f1f8e9; border-radius: 8px; border-left: 5px solid #4CAF50;">
             <p style="margin-bottom: 5px; color: #555; font-size: 0.9rem;">Total Classifications</p>
@@ -70,7 +67,7 @@ if history:
         ''', unsafe_allow_html=True)
     
     with col2:
-        avg_confidence = np.mean([entry.get('confidence', 0) for entry in history])
+        avg_confidence = overview['avg_confidence']
         st.markdown(f'''
         <div style="text-align: center; padding: 1rem; background-color: #f1f8e9; border-radius: 8px; border-left: 5px solid #4CAF50;">
             <p style="margin-bottom: 5px; color: #555; font-size: 0.9rem;">Average Confidence</p>
@@ -79,13 +76,8 @@ if history:
         ''', unsafe_allow_html=True)
     
     with col3:
-        if len(history) > 1:
-            # Calculate classifications in last 24 hours
-            today = datetime.now()
-            yesterday = today - timedelta(days=1)
-            recent_count = sum(1 for entry in history if datetime.strptime(entry['timestamp'], "%Y-%m-%d %H:%M:%S") > yesterday)
-        else:
-            recent_count = 0
+        # Classifications in the last 24 hours
+        recent_count = overview['recent_24h']
             
         st.markdown(f'''
         <div style="text-align: center; padding: 1rem; background-color: #f1f8e9; border-radius: 8px; border-left: 5px solid #4CAF50;">
@@ -336,10 +328,11 @@ if history:
                     if len(history) > 0:
                         # Example CO2 savings calculation (simplified for illustration)
                         # In a real app, you would use more accurate values based on waste type
-                        plastic_count = sum(1 for entry in history if entry.get('category') == 'plastic')
-                        glass_count = sum(1 for entry in history if entry.get('category') == 'glass')
-                        metal_count = sum(1 for entry in history if entry.get('category') == 'metal')
-                        paper_count = sum(1 for entry in history if entry.get('category') == 'paper')
+                        category_counts = {item['category']: item['count'] for item in stats_by_category}
+                        plastic_count = category_counts.get('plastic', 0)
+                        glass_count = category_counts.get('glass', 0)
+                        metal_count = category_counts.get('metal', 0)
+                        paper_count = category_counts.get('paper', 0)
                         
                         # Example savings factors (kg CO2 per item recycled)
                         co2_savings = plastic_count * 0.5 + glass_count * 0.3 + metal_count * 1.5 + paper_count * 0.2
@@ -459,6 +452,38 @@ if history:
 else:
     st.info("No classification data available yet. Start classifying waste images to build your dashboard!")
 
+# Performance panel, only when metrics collection is enabled (RECYCLEAI_METRICS=1)
+if metrics.ENABLED:
+    st.markdown('<h2 style="color: #2E7D32; border-bottom: 2px solid #4CAF50; padding-bottom: 8px;">⏱️ Performance</h2>', unsafe_allow_html=True)
+    
+    with st.expander("Stage latencies and counters", expanded=False):
+        snapshot = metrics.snapshot()
+        
+        if snapshot["stages"]:
+            stage_df = pd.DataFrame([
+                {"Stage": name, **values} for name, values in sorted(snapshot["stages"].items())
+            ]).rename(columns={
+                "count": "Count",
+                "mean_ms": "Mean (ms)",
+                "p50_ms": "p50 (ms)",
+                "p95_ms": "p95 (ms)",
+                "p99_ms": "p99 (ms)",
+            })
+            st.dataframe(stage_df.round(2), use_container_width=True, hide_index=True)
+        else:
+            st.info("No timings recorded yet.")
+        
+        if snapshot["counters"]:
+            counter_df = pd.DataFrame([
+                {
+                    "Counter": name,
+                    "Labels": ", ".join(f"{key}={value}" for key, value in labels),
+                    "Value": value,
+                }
+                for (name, labels), value in sorted(snapshot["counters"].items())
+            ])
+            st.dataframe(counter_df, use_container_width=True, hide_index=True)
+
 # Footer with styled design
 # st.markdown('</div>', unsafe_allow_html=True)  # Close the last container
 
@@ -0,0 +1,123 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import metrics
+
+class PredictionCache:
+    """
+    Content-addressed cache of model predictions
+    
+    Entries are keyed by a BLAKE2b hash of the uploaded file bytes plus the
+    model version, so byte-identical uploads skip decoding and inference.
+    A bounded in-memory LRU tier sits in front of an optional on-disk tier
+    that survives restarts.
+    """
+    def __init__(self, max_entries=512, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+    
+    @staticmethod
+    def make_key(data, version):
+        """
+        Build the cache key for raw upload bytes and a model version
+        """
+        digest = hashlib.blake2b(data, digest_size=16)
+        digest.update(str(version).encode('utf-8'))
+        return digest.hexdigest()
+    
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.npy")
+    
+    def get(self, data, version):
+        """
+        Look up the cached predictions for an upload
+        
+        Returns:
+            Probability array, or None on a miss
+        """
+        key = self.make_key(data, version)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.increment('prediction_cache_requests', result='hit')
+                return self._entries[key]
+        
+        if self.disk_dir:
+            try:
+                predictions = np.load(self._disk_path(key))
+            except (OSError, ValueError):
+                predictions = None
+            if predictions is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, predictions)
+                metrics.increment('prediction_cache_requests', result='disk_hit')
+                return predictions
+        
+        with self._lock:
+            self.misses += 1
+        metrics.increment('prediction_cache_requests', result='miss')
+        return None
+    
+    def put(self, data, version, predictions):
+        """
+        Store the predictions for an upload in both tiers
+        """
+        key = self.make_key(data, version)
+        predictions = np.asarray(predictions)
+        with self._lock:
+            self._remember(key, predictions)
+        
+        if self.disk_dir:
+            # Write to a temporary file first so readers never see a partial entry
+            tmp_path = f"{self._disk_path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(tmp_path, 'wb') as f:
+                    np.save(f, predictions)
+                os.replace(tmp_path, self._disk_path(key))
+            except OSError as e:
+                print(f"Error writing prediction cache: {str(e)}")
+    
+    def get_or_compute(self, data, version, compute):
+        """
+        Return cached predictions, calling compute() and caching on a miss
+        """
+        predictions = self.get(data, version)
+        if predictions is None:
+            predictions = compute()
+            self.put(data, version, predictions)
+        return predictions
+    
+    def _remember(self, key, predictions):
+        self._entries[key] = predictions
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def stats(self):
+        """
+        Get hit/miss counters
+        
+        Returns:
+            Dictionary with memory hits, disk hits, misses and current size
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "entries": len(self._entries),
+            }
@@ -0,0 +1,86 @@
+"""
+Process-wide model preloading
+
+Loading and warming the model is started once per process, on a background
+thread, as early as possible: serve.py kicks it off before the Streamlit
+server even starts, and app.py falls back to starting it on the first run.
+Sessions then block on get_model() only if loading has not finished yet.
+"""
+import os
+import threading
+
+_lock = threading.Lock()
+_ready = threading.Event()
+_thread = None
+_model = None
+_error = None
+
+def load_kwargs_from_env():
+    """
+    Model settings from the environment
+    
+    RECYCLEAI_INFERENCE_WORKERS > 0 moves heuristic inference into a process pool;
+    RECYCLEAI_MODEL_BACKEND=torch serves the network trained by train.py
+    and RECYCLEAI_MODEL_BACKEND=linear the model fitted by linear_model.py,
+    from RECYCLEAI_WEIGHTS if set.
+    """
+    return {
+        "num_workers": int(os.environ.get("RECYCLEAI_INFERENCE_WORKERS", "0")),
+        "backend": os.environ.get("RECYCLEAI_MODEL_BACKEND", "heuristic"),
+        "weights_path": os.environ.get("RECYCLEAI_WEIGHTS"),
+    }
+
+def _load(load_kwargs):
+    global _model, _error
+    try:
+        # Heavy imports (NumPy, OpenCV, optionally PyTorch) happen here,
+        # off the thread that serves the page
+        import numpy as np
+        from model import load_model
+        
+        model = load_model(**load_kwargs)
+        
+        # One throwaway prediction initialises OpenCV and the NumPy kernels
+        model.predict(np.zeros((1, 224, 224, 3), dtype=np.uint8))
+        _model = model
+    except Exception as e:
+        _error = e
+    finally:
+        _ready.set()
+
+def start(**load_kwargs):
+    """
+    Start loading the model in the background; later calls are no-ops
+    
+    Args:
+        **load_kwargs: Passed to model.load_model, defaults to load_kwargs_from_env()
+    """
+    global _thread
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_load,
+                args=(load_kwargs or load_kwargs_from_env(),),
+                name="model-preload",
+                daemon=True,
+            )
+            _thread.start()
+
+def is_ready():
+    """Whether loading has finished, successfully or not"""
+    return _ready.is_set()
+
+def get_model(timeout=None):
+    """
+    Get the preloaded model, starting and waiting for the load if needed
+    
+    Raises:
+        TimeoutError: If the model is not ready within timeout seconds
+        Exception: Whatever load_model raised
+    """
+    start()
+    if not _ready.wait(timeout):
+        raise TimeoutError("Model is still loading")
+    if _error is not None:
+        raise _error
+    return _model
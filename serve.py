@@ -0,0 +1,25 @@
+"""
+Start the Streamlit app with the model preloaded at server boot
+
+    python serve.py --server.port 5000
+
+Arguments are passed through to `streamlit run app.py`. The model is loaded
+and warmed on a background thread while Streamlit starts up, so the first
+visitor after a cold start does not wait for it. With
+RECYCLEAI_METRICS_PORT set, Prometheus metrics are served on that port.
+"""
+import sys
+
+import metrics
+import preload
+
+def main():
+    preload.start()
+    metrics.serve_from_env()
+    
+    from streamlit.web import cli as stcli
+    sys.argv = ["streamlit", "run", "app.py", *sys.argv[1:]]
+    sys.exit(stcli.main())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Headless HTTP inference service for conveyor controllers and other machines
+
+    python service.py --port 8000
+
+Only depends on Flask and the model stack (NumPy, Pillow, OpenCV); it never
+imports Streamlit, plotly or pandas, so replicas start fast and stay small.
+
+Endpoints:
+    GET  /health           Liveness check with the model version
+    GET  /stats            Prediction cache and micro-batching metrics
+    GET  /metrics          Stage latencies and counters in Prometheus text
+                           format (enable with RECYCLEAI_METRICS=1)
+    POST /classify         One image, as the raw request body or a
+                           multipart field named "image"
+    POST /classify/batch   Several images as multipart fields named
+                           "images"; add ?stream=1 for a chunked NDJSON
+                           response with one line per image
+"""
+import argparse
+import json
+
+import numpy as np
+from flask import Flask, Response, jsonify, request, stream_with_context
+from werkzeug.serving import WSGIRequestHandler
+
+import metrics
+from batching import MicroBatcher, QueueFullError
+from model import load_model, preprocessor
+from prediction_cache import PredictionCache
+
+# Images decoded and classified together when streaming a batch response
+STREAM_CHUNK_SIZE = 16
+
+def format_prediction(model, predictions):
+    """
+    Build the JSON body for one image from its probability vector
+    """
+    predicted_index = int(np.argmax(predictions))
+    return {
+        "category": model.categories[predicted_index],
+        "confidence": float(predictions[predicted_index] * 100),
+        "probabilities": {
+            category: float(probability)
+            for category, probability in zip(model.categories, predictions)
+        },
+        "model_version": model.version,
+    }
+
+def classify_uploads(model, cache, uploads, runner=None):
+    """
+    Classify a list of (name, bytes) uploads in one batch
+    
+    Args:
+        model: Classifier whose categories and version label the results
+        cache: PredictionCache consulted before decoding
+        uploads: List of (name, bytes) tuples
+        runner: Object whose predict_batch does the work, e.g. a
+            MicroBatcher wrapping the model; defaults to the model itself
+    
+    Returns:
+        List of result dictionaries in input order; uploads that cannot be
+        decoded get an "error" entry instead of failing the whole batch
+    """
+    results = [None] * len(uploads)
+    pending = []
+    preprocess = preprocessor(model)
+    for index, (name, data) in enumerate(uploads):
+        cached = cache.get(data, model.version)
+        if cached is not None:
+            results[index] = {"name": name, **format_prediction(model, cached)}
+            continue
+        try:
+            pending.append((index, data, preprocess(data)[0]))
+        except (ValueError, OSError) as e:
+            results[index] = {"name": name, "error": f"Could not decode image: {str(e)}"}
+    
+    if pending:
+        predictions = (runner or model).predict_batch(np.stack([array for _, _, array in pending]))
+        for (index, data, _), probs in zip(pending, predictions):
+            cache.put(data, model.version, probs)
+            results[index] = {"name": uploads[index][0], **format_prediction(model, probs)}
+    
+    for result in results:
+        if "category" in result:
+            metrics.increment("classifications", category=result["category"])
+    
+    return results
+
+def create_app(model=None, cache=None, batcher=None):
+    """
+    Create the Flask application
+    
+    Args:
+        model: Classifier to serve; defaults to load_model()
+        cache: PredictionCache for repeated uploads; defaults to an in-memory one
+        batcher: Optional MicroBatcher around the model; concurrent requests
+            are then classified together
+    """
+    app = Flask(__name__)
+    model = model or load_model()
+    cache = cache or PredictionCache()
+    
+    def error(message, status=400):
+        return jsonify({"error": message}), status
+    
+    @app.errorhandler(QueueFullError)
+    def overloaded(e):
+        return error(str(e), 503)
+    
+    @app.get("/health")
+    def health():
+        return jsonify({"status": "ok", "model_version": model.version})
+    
+    @app.get("/stats")
+    def stats():
+        return jsonify({
+            "cache": cache.stats(),
+            "batcher": batcher.metrics() if batcher is not None else None,
+        })
+    
+    @app.get("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+    
+    @app.post("/classify")
+    def classify():
+        upload = request.files.get("image")
+        data = upload.read() if upload is not None else request.get_data()
+        if not data:
+            return error("No image provided")
+        
+        with metrics.stage("classify"):
+            result = classify_uploads(model, cache, [("image", data)], batcher)[0]
+        if "error" in result:
+            return error(result["error"])
+        return jsonify(result)
+    
+    @app.post("/classify/batch")
+    def classify_batch():
+        uploads = [(upload.filename, upload.read()) for upload in request.files.getlist("images")]
+        if not uploads:
+            return error("No images provided")
+        
+        if request.args.get("stream") not in ("1", "true"):
+            return jsonify({"results": classify_uploads(model, cache, uploads, batcher)})
+        
+        def generate():
+            for start in range(0, len(uploads), STREAM_CHUNK_SIZE):
+                chunk = uploads[start:start + STREAM_CHUNK_SIZE]
+                for result in classify_uploads(model, cache, chunk, batcher):
+                    yield json.dumps(result) + "\n"
+        
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+    
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description="Waste classification HTTP service")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--backend", choices=["heuristic", "linear", "torch"], default="heuristic")
+    parser.add_argument("--weights", default=None,
+                        help="Trained weights for the linear (waste_linear.npz) or torch (waste_model.pth) backend")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="Inference worker processes for the heuristic backend "
+                             "(0 = classify in the request thread)")
+    parser.add_argument("--cache-dir", default=None,
+                        help="Directory for the on-disk prediction cache")
+    parser.add_argument("--batch-delay-ms", type=float, default=5.0,
+                        help="Longest wait for concurrent requests to form a batch (0 = no micro-batching)")
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-queue", type=int, default=1024,
+                        help="Pending images beyond this are rejected with 503")
+    args = parser.parse_args()
+    
+    model = load_model(num_workers=args.workers, backend=args.backend, weights_path=args.weights)
+    batcher = None
+    if args.batch_delay_ms > 0:
+        batcher = MicroBatcher(model, max_batch_size=args.max_batch_size,
+                               max_delay=args.batch_delay_ms / 1000,
+                               max_queue_size=args.max_queue)
+    
+    app = create_app(
+        model=model,
+        cache=PredictionCache(disk_dir=args.cache_dir),
+        batcher=batcher,
+    )
+    
+    # HTTP/1.1 keeps client connections alive between requests
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    app.run(host=args.host, port=args.port, threaded=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import os
+
+import numpy as np
+import torch
+import torch.nn as nn
+from torchvision import models, transforms
+
+import metrics
+from model import INPUT_SIZE, file_digest, preprocess_image
+
+CATEGORIES = ['plastic', 'glass', 'metal', 'paper', 'organic', 'e-waste']
+
+# Normalisation used by train.py
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+# Shorter side images are scaled to before the centre crop to INPUT_SIZE
+RESIZE_SIZE = 256
+
+def center_crop_transform():
+    """
+    The deterministic part of the train.py transform: keep the aspect ratio,
+    scale the shorter side to RESIZE_SIZE and crop the centre to INPUT_SIZE.
+    Serving applies the same transform, so the network sees the same view
+    of an image it was trained on.
+    """
+    return transforms.Compose([
+        transforms.Resize(RESIZE_SIZE),
+        transforms.CenterCrop(INPUT_SIZE[::-1]),
+    ])
+
+def build_network(num_classes=len(CATEGORIES), pretrained=False):
+    """
+    Build the network trained by train.py: ResNet-18 with a new head
+    
+    Args:
+        num_classes: Number of output classes
+        pretrained: Start from ImageNet weights (downloaded by torchvision)
+    """
+    weights = models.ResNet18_Weights.DEFAULT if pretrained else None
+    network = models.resnet18(weights=weights)
+    network.fc = nn.Linear(network.fc.in_features, num_classes)
+    return network
+
+def build_student_network(num_classes=len(CATEGORIES)):
+    """
+    Build the small network distilled from build_network() by train.py --distill
+    
+    MobileNetV3-Small: about 1.5M parameters against ResNet-18's 11M, with
+    depthwise convolutions that keep single-image CPU latency low. It takes
+    the same normalised 224x224 input, so its TorchScript export serves
+    through TorchWasteClassifier unchanged.
+    """
+    network = models.mobilenet_v3_small(weights=None)
+    network.classifier[-1] = nn.Linear(network.classifier[-1].in_features, num_classes)
+    return network
+
+def configure_threads(num_threads=None, num_interop_threads=1):
+    """
+    Set PyTorch's intra-op and inter-op thread pools for CPU inference
+    
+    A single forward pass only benefits from intra-op parallelism, so one
+    inter-op thread is enough. The inter-op pool can only be sized before
+    PyTorch first uses it; later calls keep the existing size.
+    """
+    torch.set_num_threads(num_threads or os.cpu_count() or 1)
+    try:
+        torch.set_num_interop_threads(num_interop_threads)
+    except RuntimeError:
+        pass
+
+class TorchWasteClassifier:
+    """
+    Serves the network trained by train.py with the WasteClassifier contract
+    
+    A state dict (.pth) is loaded into build_network() and compiled with
+    TorchScript (trace, freeze, optimize_for_inference); an already exported
+    TorchScript archive (.pt) is loaded as is. The model is warmed up at
+    load time so the first request does not pay for graph optimisation.
+    
+    Args:
+        weights_path: Trained weights (.pth state dict or .pt TorchScript)
+        num_threads: Intra-op threads, defaults to the CPU count
+        num_interop_threads: Inter-op threads
+        warmup_batch_sizes: Batch sizes run once at load time
+    """
+    def __init__(self, weights_path='waste_model.pth', num_threads=None, num_interop_threads=1,
+                 warmup_batch_sizes=(1,)):
+        configure_threads(num_threads, num_interop_threads)
+        
+        self.categories = list(CATEGORIES)
+        self.version = f"torch-{file_digest(weights_path)}"
+        self.module = self._load(weights_path)
+        
+        self._crop = center_crop_transform()
+        self._mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+        self._std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+        
+        for batch_size in warmup_batch_sizes:
+            self.predict_batch(np.zeros((batch_size, 224, 224, 3), dtype=np.uint8))
+    
+    @staticmethod
+    def _load(weights_path):
+        if weights_path.endswith('.pt'):
+            module = torch.jit.load(weights_path, map_location='cpu')
+            return module.eval()
+        
+        network = build_network()
+        network.load_state_dict(torch.load(weights_path, map_location='cpu'))
+        network.eval()
+        
+        example = torch.zeros(1, 3, 224, 224).contiguous(memory_format=torch.channels_last)
+        network = network.to(memory_format=torch.channels_last)
+        with torch.no_grad():
+            traced = torch.jit.trace(network, example)
+            return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+    
+    def preprocess(self, image, timings=None):
+        """
+        Decode an image the way train.py feeds it to the network (see
+        center_crop_transform) rather than squashing the whole frame
+        
+        Args:
+            image: Anything model.preprocess_image accepts
+            timings: Passed on to preprocess_image
+        
+        Returns:
+            uint8 array of shape (1, 224, 224, 3)
+        """
+        # JPEG draft decoding must leave the shorter side at RESIZE_SIZE or more
+        return preprocess_image(image, as_uint8=True, timings=timings, resize=self._crop,
+                                draft_size=(RESIZE_SIZE, RESIZE_SIZE))
+    
+    def _to_tensor(self, image_batch):
+        """
+        Convert an (N, H, W, 3) uint8 or [0, 1] float batch to a normalised
+        NCHW tensor; permuting NHWC data gives channels-last strides for free
+        """
+        image_batch = np.ascontiguousarray(image_batch)
+        if not image_batch.flags.writeable:
+            # e.g. np.asarray of a PIL image; torch cannot wrap read-only memory
+            image_batch = image_batch.copy()
+        tensor = torch.from_numpy(image_batch).permute(0, 3, 1, 2)
+        if tensor.dtype == torch.uint8:
+            tensor = tensor.float().div_(255.0)
+        else:
+            tensor = tensor.float()
+        return (tensor - self._mean) / self._std
+    
+    def predict(self, image_array):
+        """
+        Predict a single image, with or without batch dimension
+        """
+        if len(image_array.shape) == 3:
+            image_array = image_array[np.newaxis]
+        return self.predict_batch(image_array[:1])[0]
+    
+    def predict_batch(self, image_batch):
+        """
+        Predict a batch of images
+        
+        Args:
+            image_batch: Array of shape (N, 224, 224, 3), floats in [0, 1]
+                or uint8 pixels
+        
+        Returns:
+            Array of shape (N, 6) with one probability row per image
+        """
+        image_batch = np.asarray(image_batch)
+        if image_batch.ndim == 3:
+            image_batch = image_batch[np.newaxis]
+        
+        with metrics.stage('inference'), torch.inference_mode():
+            logits = self.module(self._to_tensor(image_batch))
+            return torch.softmax(logits.float(), dim=1).numpy().astype(np.float64)
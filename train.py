@@ -1,131 +1,805 @@
 import torch
 import torch.nn as nn
+import torch.distributed as dist
+import torch.multiprocessing as mp
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import Dataset, DataLoader, DistributedSampler
 from torchvision import transforms
 from PIL import Image
+import argparse
+import copy
+import io
+import json
 import os
+import queue
+import random
+import socket
+import threading
+import time
 from tqdm import tqdm
 import numpy as np
-from model import WasteClassifier
+from dataset_index import INDEX_FILE, DatasetIndex, report as report_index
+from model import IMAGE_EXTENSIONS
+from torch_backend import build_network, build_student_network, center_crop_transform
 
 class WasteDataset(Dataset):
-    def __init__(self, root_dir, transform=None):
+    """
+    Images in root_dir/<class_name>/ with their class labels
+    
+    With cache_dir pointing at a cache written by build_image_cache, samples
+    are read zero-copy from the memory-mapped uint8 array instead of being
+    decoded, and transform only needs to cover what comes after
+    Resize/CenterCrop (e.g. ToTensor and Normalize).
+    
+    With index, a DatasetIndex of root_dir's parent, the samples come from
+    the manifest (sorted by path, undecodable files left out) instead of
+    from listing the class directories.
+    """
+    def __init__(self, root_dir, transform=None, cache_dir=None, index=None):
         self.root_dir = root_dir
         self.transform = transform
+        self.cache_dir = cache_dir
         self.classes = ['plastic', 'glass', 'metal', 'paper', 'organic', 'e-waste']
         self.class_to_idx = {cls: idx for idx, cls in enumerate(self.classes)}
         
         self.images = []
         self.labels = []
         
-        # Load all images and labels
-        for class_name in self.classes:
-            class_dir = os.path.join(root_dir, class_name)
-            if os.path.exists(class_dir):
-                for img_name in os.listdir(class_dir):
-                    if img_name.lower().endswith(('.png', '.jpg', '.jpeg')):
-                        self.images.append(os.path.join(class_dir, img_name))
-                        self.labels.append(self.class_to_idx[class_name])
+        if index is not None:
+            split = os.path.basename(os.path.normpath(root_dir))
+            for path, class_name in index.samples(split):
+                if class_name in self.class_to_idx:
+                    self.images.append(os.path.join(index.root, path))
+                    self.labels.append(self.class_to_idx[class_name])
+        else:
+            # Load all images and labels
+            for class_name in self.classes:
+                class_dir = os.path.join(root_dir, class_name)
+                if os.path.exists(class_dir):
+                    for img_name in os.listdir(class_dir):
+                        if img_name.lower().endswith(IMAGE_EXTENSIONS):
+                            self.images.append(os.path.join(class_dir, img_name))
+                            self.labels.append(self.class_to_idx[class_name])
+        
+        # Opened lazily so every DataLoader worker maps the file itself
+        self._cached_images = None
+        if cache_dir is not None and not cache_matches(cache_dir, self.images):
+            raise ValueError(f"Image cache in {cache_dir} does not match {root_dir}; rebuild it")
     
     def __len__(self):
         return len(self.images)
     
     def __getitem__(self, idx):
-        img_path = self.images[idx]
-        image = Image.open(img_path).convert('RGB')
         label = self.labels[idx]
         
+        if self.cache_dir is not None:
+            if self._cached_images is None:
+                # Copy-on-write keeps reads zero-copy while giving transforms a writable view
+                self._cached_images = np.load(os.path.join(self.cache_dir, 'images.npy'), mmap_mode='c')
+            image = self._cached_images[idx]
+        else:
+            image = Image.open(self.images[idx]).convert('RGB')
+        
         if self.transform:
             image = self.transform(image)
         
         return image, label
 
-def train_model(model, train_loader, val_loader, criterion, optimizer, num_epochs, device):
+def file_signatures(image_paths):
+    """
+    [size, mtime_ns] of every file, to notice images edited in place
+    """
+    signatures = []
+    for path in image_paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            signatures.append(None)
+            continue
+        signatures.append([stat.st_size, stat.st_mtime_ns])
+    return signatures
+
+def cache_matches(cache_dir, image_paths):
+    """
+    Whether cache_dir holds a complete cache of exactly these image paths,
+    none of which changed size or modification time since it was built
+    """
+    manifest_path = os.path.join(cache_dir, 'manifest.json')
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    image_paths = list(image_paths)
+    return (bool(manifest.get('complete')) and manifest.get('paths') == image_paths
+            and manifest.get('files') == file_signatures(image_paths))
+
+def _stack_images(batch):
+    return np.stack([image for image, _ in batch])
+
+def build_image_cache(root_dir, cache_dir, decode_transform, num_workers=4, batch_size=64, index=None):
+    """
+    Decode every image of a dataset once into a memory-mapped array
+    
+    Writes images.npy (uint8, N x 224 x 224 x 3), labels.npy and a
+    manifest.json listing the source paths with their sizes and
+    modification times; the manifest is written last
+    and marked complete, so an interrupted build is never mistaken for a
+    usable cache.
+    
+    Args:
+        root_dir: Dataset directory as passed to WasteDataset
+        cache_dir: Output directory
+        decode_transform: Deterministic PIL transform producing 224x224
+            images (Resize + CenterCrop)
+        index: Optional DatasetIndex, as passed to WasteDataset
+    """
+    dataset = WasteDataset(root_dir, transform=transforms.Compose([decode_transform, np.asarray]), index=index)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Taken before decoding, so an edit made during the build invalidates the cache
+    signatures = file_signatures(dataset.images)
+    
+    images = np.lib.format.open_memmap(os.path.join(cache_dir, 'images.npy'), mode='w+',
+                                       dtype=np.uint8, shape=(len(dataset), 224, 224, 3))
+    loader = DataLoader(dataset, batch_size=batch_size, shuffle=False, num_workers=num_workers,
+                        collate_fn=_stack_images)
+    
+    start = 0
+    for batch in tqdm(loader, desc=f'Caching {root_dir}'):
+        images[start:start + len(batch)] = batch
+        start += len(batch)
+    images.flush()
+    del images
+    
+    np.save(os.path.join(cache_dir, 'labels.npy'), np.array(dataset.labels, dtype=np.int64))
+    with open(os.path.join(cache_dir, 'manifest.json'), 'w') as f:
+        json.dump({
+            'root_dir': root_dir,
+            'classes': dataset.classes,
+            'shape': [len(dataset), 224, 224, 3],
+            'paths': dataset.images,
+            'files': signatures,
+            'complete': True,
+        }, f)
+
+class CheckpointWriter:
+    """
+    Writes checkpoints on a background thread
+    
+    save() snapshots the state to host memory and returns; the thread then
+    serializes it to a temporary file, fsyncs and renames it over the
+    destination, so a crash mid-write never leaves a truncated checkpoint.
+    An error in the thread is raised by the next save() or close().
+    """
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=2)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, name='checkpoint-writer', daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            state, path = item
+            try:
+                tmp_path = path + '.tmp'
+                with open(tmp_path, 'wb') as f:
+                    torch.save(state, f)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, path)
+            except Exception as e:
+                self._error = e
+    
+    def _raise_error(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise RuntimeError('Writing a checkpoint failed') from error
+    
+    def save(self, state, path):
+        self._raise_error()
+        # Copy now: the training loop keeps updating these tensors in place
+        self._queue.put((_detached_copy(state), path))
+    
+    def close(self):
+        """Wait for pending writes to finish"""
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_error()
+
+def _detached_copy(state):
+    if isinstance(state, torch.Tensor):
+        return state.detach().to('cpu', copy=True)
+    if isinstance(state, dict):
+        return {key: _detached_copy(value) for key, value in state.items()}
+    if isinstance(state, (list, tuple)):
+        return type(state)(_detached_copy(value) for value in state)
+    return copy.deepcopy(state)
+
+def rng_state():
+    """RNG states that decide shuffling, augmentation and worker seeds"""
+    return {
+        'python': random.getstate(),
+        'numpy': np.random.get_state(),
+        'torch': torch.get_rng_state(),
+        'cuda': torch.cuda.get_rng_state_all() if torch.cuda.is_available() else [],
+    }
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    np.random.set_state(state['numpy'])
+    torch.set_rng_state(state['torch'])
+    if state['cuda'] and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+def init_distributed():
+    """
+    Join the gloo process group described by torchrun-style environment variables
+    
+    torchrun (one or several hosts) and launch_local set RANK, WORLD_SIZE,
+    MASTER_ADDR and MASTER_PORT. Torch threads are split evenly between the
+    processes sharing a host.
+    
+    Returns:
+        (rank, world_size); (0, 1) when not started as part of a group
+    """
+    world_size = int(os.environ.get('WORLD_SIZE', 1))
+    if world_size == 1:
+        return 0, 1
+    if not dist.is_initialized():
+        local_world_size = int(os.environ.get('LOCAL_WORLD_SIZE', world_size))
+        torch.set_num_threads(max(1, (os.cpu_count() or 1) // local_world_size))
+        dist.init_process_group('gloo')
+    return dist.get_rank(), world_size
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _run_local_rank(rank, world_size, port, target, args):
+    os.environ.update(MASTER_ADDR='127.0.0.1', MASTER_PORT=str(port), RANK=str(rank),
+                      LOCAL_RANK=str(rank), WORLD_SIZE=str(world_size), LOCAL_WORLD_SIZE=str(world_size))
+    try:
+        target(*args)
+    finally:
+        if dist.is_initialized():
+            dist.destroy_process_group()
+
+def launch_local(target, nproc, *args):
+    """
+    Run target(*args) in nproc processes on this host, forming one process group
+    """
+    mp.spawn(_run_local_rank, args=(nproc, _free_port(), target, args), nprocs=nproc)
+
+def make_loader(dataset, batch_size, shuffle, num_workers=4):
+    """
+    DataLoader that shards the dataset across the process group, if there is one
+    
+    batch_size is the global batch: each of the world_size processes loads
+    batch_size / world_size samples per step, so with gradients averaged
+    over processes a step sees the same samples as in a single process.
+    """
+    if not dist.is_initialized():
+        return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers)
+    world_size = dist.get_world_size()
+    if batch_size % world_size:
+        raise ValueError(f'Batch size {batch_size} is not divisible by the {world_size} processes')
+    sampler = DistributedSampler(dataset, shuffle=shuffle)
+    return DataLoader(dataset, batch_size=batch_size // world_size, sampler=sampler, num_workers=num_workers)
+
+def distillation_loss(temperature=4.0, alpha=0.9):
+    """
+    Knowledge-distillation criterion for train_model(..., teacher=...)
+    
+    Blends the KL divergence between the temperature-softened teacher and
+    student distributions (scaled by T^2 so its gradients keep their size
+    as T changes) with the cross-entropy on the hard labels.
+    
+    Args:
+        temperature: Softening temperature T
+        alpha: Weight of the soft-label term; 1 - alpha goes to the labels
+    """
+    def criterion(outputs, labels, teacher_outputs):
+        soft = nn.functional.kl_div(
+            nn.functional.log_softmax(outputs / temperature, dim=1),
+            nn.functional.log_softmax(teacher_outputs / temperature, dim=1),
+            reduction='batchmean', log_target=True,
+        ) * temperature ** 2
+        return alpha * soft + (1 - alpha) * nn.functional.cross_entropy(outputs, labels)
+    return criterion
+
+def train_model(model, train_loader, val_loader, criterion, optimizer, num_epochs, device,
+                channels_last=False, bf16=False, compile_model=False, save_path='waste_model.pth',
+                checkpoint_path=None, checkpoint_every=1, resume=False, teacher=None):
+    """
+    Train and validate for num_epochs, saving the best model to save_path
+    
+    Loss and accuracy are accumulated on the device and only read back once
+    per epoch, so the loop never waits on the host between steps.
+    
+    Inside a process group (see init_distributed) the model is wrapped in
+    DistributedDataParallel, which averages gradients across processes;
+    the loaders should come from make_loader. Metrics are reduced over all
+    processes and only rank 0 logs and writes files.
+    
+    Args:
+        channels_last: Use the channels-last memory layout, which oneDNN's
+            CPU convolutions prefer
+        bf16: Run forward passes under bfloat16 autocast; worthwhile on CPUs
+            with native bf16 support (AVX512-BF16 / AMX)
+        compile_model: Compile the model with torch.compile
+        save_path: Where to save the best weights; None disables saving
+        checkpoint_path: Where to write resumable checkpoints (model,
+            optimizer, epoch, RNG states, best accuracy); None disables them
+        checkpoint_every: Write a checkpoint every this many epochs and
+            after the last one
+        resume: Continue from checkpoint_path if it exists
+        teacher: Frozen network whose outputs on each batch are passed to
+            criterion(outputs, labels, teacher_outputs), e.g. a
+            distillation_loss()
+    
+    Returns:
+        List with one dictionary of metrics per epoch
+    """
+    device = torch.device(device)
+    distributed = dist.is_initialized()
+    is_main = not distributed or dist.get_rank() == 0
     best_val_acc = 0.0
+    history = []
+    start_epoch = 0
+    
+    checkpoint = None
+    resuming = resume and checkpoint_path is not None
+    if resuming and is_main and os.path.exists(checkpoint_path):
+        # Loaded on the CPU: set_rng_state needs CPU ByteTensors, and
+        # load_state_dict copies the weights and optimizer state to the
+        # parameters' device anyway
+        checkpoint = torch.load(checkpoint_path, map_location='cpu', weights_only=False)
+        model.load_state_dict(checkpoint.pop('model'))
+    if resuming and distributed:
+        # Only rank 0 reads the file, as hosts need not share storage; it
+        # sends the rest of the state to the other ranks, and wrapping the
+        # model in DDP below copies its weights to them
+        shared = [checkpoint]
+        dist.broadcast_object_list(shared, src=0)
+        checkpoint = shared[0]
+    if checkpoint is not None:
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        set_rng_state(checkpoint['rng'])
+        start_epoch = checkpoint['epoch']
+        best_val_acc = checkpoint['best_val_acc']
+        history = checkpoint['history']
+        if is_main:
+            print(f'Resuming from {checkpoint_path} after epoch {start_epoch}')
+    
+    writer = CheckpointWriter() if is_main else None
     
-    for epoch in range(num_epochs):
-        print(f'Epoch {epoch+1}/{num_epochs}')
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    if teacher is not None:
+        teacher = teacher.to(device, memory_format=memory_format).eval()
+    step_model = DistributedDataParallel(model) if distributed else model
+    if compile_model:
+        step_model = torch.compile(step_model)
+    
+    def autocast():
+        return torch.autocast(device_type=device.type, dtype=torch.bfloat16, enabled=bf16)
+    
+    for epoch in range(start_epoch, num_epochs):
+        if is_main:
+            print(f'Epoch {epoch+1}/{num_epochs}')
+        if isinstance(train_loader.sampler, DistributedSampler):
+            train_loader.sampler.set_epoch(epoch)
+        epoch_start = time.perf_counter()
         
         # Training phase
         model.train()
-        running_loss = 0.0
-        correct = 0
+        running_loss = torch.zeros((), dtype=torch.double, device=device)
+        correct = torch.zeros((), dtype=torch.long, device=device)
         total = 0
         
-        for images, labels in tqdm(train_loader):
-            images = images.to(device)
-            labels = labels.to(device)
+        for images, labels in tqdm(train_loader, disable=not is_main):
+            images = images.to(device, non_blocking=True, memory_format=memory_format)
+            labels = labels.to(device, non_blocking=True)
             
-            optimizer.zero_grad()
-            outputs = model(images)
-            loss = criterion(outputs, labels)
+            optimizer.zero_grad(set_to_none=True)
+            with autocast():
+                outputs = step_model(images)
+                if teacher is None:
+                    loss = criterion(outputs, labels)
+                else:
+                    with torch.no_grad():
+                        teacher_outputs = teacher(images)
+                    loss = criterion(outputs, labels, teacher_outputs)
             loss.backward()
             optimizer.step()
             
-            running_loss += loss.item()
-            _, predicted = torch.max(outputs.data, 1)
+            running_loss += loss.detach()
             total += labels.size(0)
-            correct += (predicted == labels).sum().item()
+            correct += (outputs.detach().argmax(1) == labels).sum()
         
+        totals = torch.stack([running_loss, correct.double(), torch.tensor(total, dtype=torch.double, device=device)])
+        if distributed:
+            dist.all_reduce(totals)
+            totals[0] /= dist.get_world_size()
+        train_seconds = time.perf_counter() - epoch_start
+        running_loss, correct, total = totals.tolist()
+        train_loss = running_loss / len(train_loader)
         train_acc = 100 * correct / total
-        print(f'Training Loss: {running_loss/len(train_loader):.4f}, Accuracy: {train_acc:.2f}%')
+        if is_main:
+            print(f'Training Loss: {train_loss:.4f}, Accuracy: {train_acc:.2f}%, '
+                  f'{total / train_seconds:.1f} samples/s')
         
         # Validation phase
         model.eval()
-        val_correct = 0
+        val_correct = torch.zeros((), dtype=torch.long, device=device)
         val_total = 0
         
-        with torch.no_grad():
+        with torch.no_grad(), autocast():
             for images, labels in val_loader:
-                images = images.to(device)
-                labels = labels.to(device)
-                outputs = model(images)
-                _, predicted = torch.max(outputs.data, 1)
+                images = images.to(device, non_blocking=True, memory_format=memory_format)
+                labels = labels.to(device, non_blocking=True)
+                outputs = step_model(images)
                 val_total += labels.size(0)
-                val_correct += (predicted == labels).sum().item()
+                val_correct += (outputs.argmax(1) == labels).sum()
+        
+        val_totals = torch.tensor([val_correct.item(), val_total], dtype=torch.double)
+        if distributed:
+            dist.all_reduce(val_totals)
+        val_correct, val_total = val_totals.tolist()
+        val_acc = 100 * val_correct / val_total if val_total else 0.0
+        if is_main:
+            print(f'Validation Accuracy: {val_acc:.2f}%')
         
-        val_acc = 100 * val_correct / val_total
-        print(f'Validation Accuracy: {val_acc:.2f}%')
+        history.append({
+            'epoch': epoch + 1,
+            'train_loss': train_loss,
+            'train_accuracy': train_acc,
+            'val_accuracy': val_acc,
+            'train_seconds': train_seconds,
+            'samples_per_second': total / train_seconds,
+        })
         
         # Save best model
         if val_acc > best_val_acc:
             best_val_acc = val_acc
-            torch.save(model.state_dict(), 'waste_model.pth')
-            print(f'Saved best model with validation accuracy: {val_acc:.2f}%')
+            if is_main and save_path is not None:
+                writer.save(model.state_dict(), save_path)
+                print(f'Saving best model with validation accuracy: {val_acc:.2f}%')
+        
+        if is_main and checkpoint_path is not None and ((epoch + 1) % checkpoint_every == 0 or epoch + 1 == num_epochs):
+            writer.save({
+                'model': model.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'epoch': epoch + 1,
+                'best_val_acc': best_val_acc,
+                'history': history,
+                'rng': rng_state(),
+            }, checkpoint_path)
+    
+    if writer is not None:
+        writer.close()
+    if distributed:
+        # Other ranks may read the files rank 0 just wrote
+        dist.barrier()
+    return history
 
-def main():
-    # Set device
-    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-    print(f'Using device: {device}')
-    
-    # Data transforms
-    transform = transforms.Compose([
-        transforms.Resize(256),
-        transforms.CenterCrop(224),
+def evaluate_accuracy(model, data_loader, device='cpu'):
+    """
+    Top-1 accuracy of a model on a data loader, in percent
+    """
+    model.eval()
+    correct = 0
+    total = 0
+    with torch.no_grad():
+        for images, labels in data_loader:
+            images = images.to(device)
+            labels = labels.to(device)
+            outputs = model(images)
+            _, predicted = torch.max(outputs, 1)
+            total += labels.size(0)
+            correct += (predicted == labels).sum().item()
+    return 100 * correct / total if total else 0.0
+
+def measure_latency(model, batch_size=1, repeat=20):
+    """
+    Median single-batch CPU latency of a model in milliseconds
+    """
+    example = torch.randn(batch_size, 3, 224, 224)
+    samples = []
+    with torch.no_grad():
+        model(example)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            model(example)
+            samples.append(time.perf_counter() - start)
+    return sorted(samples)[len(samples) // 2] * 1000
+
+def serialized_size(model):
+    """
+    Size in bytes of a model's TorchScript archive, or of its state dict
+    """
+    buffer = io.BytesIO()
+    if isinstance(model, torch.jit.ScriptModule):
+        torch.jit.save(model, buffer)
+    else:
+        torch.save(model.state_dict(), buffer)
+    return len(buffer.getvalue())
+
+def quantize_model(model, calibration_loader, num_batches=None):
+    """
+    Post-training static int8 quantization (FX graph mode, x86 backend)
+    
+    Args:
+        model: Trained fp32 network
+        calibration_loader: Batches used to calibrate activation ranges
+        num_batches: Stop calibrating after this many batches
+    
+    Returns:
+        Traced TorchScript module running int8 kernels on CPU
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+    
+    model = model.to('cpu').eval()
+    example = torch.randn(1, 3, 224, 224)
+    prepared = prepare_fx(model, get_default_qconfig_mapping('x86'), (example,))
+    
+    with torch.no_grad():
+        for i, (images, _) in enumerate(calibration_loader):
+            if num_batches is not None and i >= num_batches:
+                break
+            prepared(images)
+    
+    quantized = convert_fx(prepared)
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(quantized, example))
+
+def quantize_and_report(val_dataset, weights_path, output_path, report_path,
+                        calibration_samples, max_accuracy_drop, batch_size=32):
+    """
+    Quantize the trained model and compare it against fp32
+    
+    Calibrates on a random sample of the validation set, then measures
+    accuracy on the full validation set, model size and CPU latency for
+    both variants. The int8 model is only written when its accuracy drop is
+    within max_accuracy_drop percentage points.
+    """
+    model = build_network()
+    model.load_state_dict(torch.load(weights_path, map_location='cpu'))
+    model.eval()
+    
+    generator = torch.Generator().manual_seed(0)
+    sample_size = min(calibration_samples, len(val_dataset))
+    indices = torch.randperm(len(val_dataset), generator=generator)[:sample_size].tolist()
+    calibration_loader = DataLoader(torch.utils.data.Subset(val_dataset, indices),
+                                    batch_size=batch_size, num_workers=4)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, num_workers=4)
+    
+    quantized = quantize_model(model, calibration_loader)
+    
+    report = {}
+    for name, variant in (('fp32', model), ('int8', quantized)):
+        report[name] = {
+            'accuracy': evaluate_accuracy(variant, val_loader),
+            'size_bytes': serialized_size(variant),
+            'latency_ms_batch1': measure_latency(variant),
+        }
+        print(f"{name}: accuracy {report[name]['accuracy']:.2f}%, "
+              f"size {report[name]['size_bytes'] / 1e6:.1f} MB, "
+              f"latency {report[name]['latency_ms_batch1']:.1f} ms")
+    
+    accuracy_drop = report['fp32']['accuracy'] - report['int8']['accuracy']
+    report['accuracy_drop'] = accuracy_drop
+    report['max_accuracy_drop'] = max_accuracy_drop
+    report['accepted'] = accuracy_drop <= max_accuracy_drop
+    
+    if report['accepted']:
+        torch.jit.save(quantized, output_path)
+        report['output'] = output_path
+        print(f'Saved int8 model to {output_path}')
+    else:
+        print(f'Accuracy drop {accuracy_drop:.2f} exceeds {max_accuracy_drop:.2f}, int8 model not saved')
+    
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    return report
+
+def parameter_count(model):
+    return sum(parameter.numel() for parameter in model.parameters())
+
+def script_network(model):
+    """
+    Trace and freeze a trained network for CPU inference
+    
+    A saved archive is served by TorchWasteClassifier as is, whatever the
+    architecture.
+    """
+    model = model.to('cpu', memory_format=torch.contiguous_format).eval()
+    example = torch.zeros(1, 3, 224, 224)
+    with torch.no_grad():
+        return torch.jit.freeze(torch.jit.trace(model, example))
+
+def distillation_report(teacher, student, val_dataset, output_path, report_path, batch_size=32):
+    """
+    Export the student and compare it against the teacher
+    
+    Writes the student as TorchScript to output_path and a JSON report of
+    validation accuracy, parameter count, archive size and single-image CPU
+    latency for both networks to report_path. Both are measured as frozen
+    TorchScript, the form they are served in.
+    """
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, num_workers=4)
+    scripted_student = script_network(student)
+    torch.jit.save(scripted_student, output_path)
+    
+    report = {'output': output_path}
+    for name, network, exported in (('teacher', teacher, script_network(teacher)),
+                                    ('student', student, scripted_student)):
+        report[name] = {
+            'accuracy': evaluate_accuracy(exported, val_loader),
+            'parameters': parameter_count(network),
+            'size_bytes': serialized_size(exported),
+            'latency_ms_batch1': measure_latency(exported),
+        }
+        print(f"{name}: accuracy {report[name]['accuracy']:.2f}%, "
+              f"{report[name]['parameters'] / 1e6:.2f}M parameters, "
+              f"latency {report[name]['latency_ms_batch1']:.1f} ms")
+    report['speedup'] = report['teacher']['latency_ms_batch1'] / report['student']['latency_ms_batch1']
+    report['accuracy_drop'] = report['teacher']['accuracy'] - report['student']['accuracy']
+    print(f"Saved student to {output_path} ({report['speedup']:.1f}x faster)")
+    
+    with open(report_path, 'w') as f:
+        json.dump(report, f, indent=2)
+    
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the waste classification network')
+    parser.add_argument('--epochs', type=int, default=10)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--pretrained', action=argparse.BooleanOptionalAction, default=True,
+                        help='Start from ImageNet weights (needs network access on first use)')
+    parser.add_argument('--channels-last', action='store_true',
+                        help='Train with the channels-last memory layout')
+    parser.add_argument('--bf16', action='store_true',
+                        help='Use bfloat16 autocast (fast on CPUs with AVX512-BF16/AMX)')
+    parser.add_argument('--compile', action='store_true', help='Compile the model with torch.compile')
+    parser.add_argument('--nproc', type=int, default=1,
+                        help='Data-parallel training processes on this host (under torchrun, set by torchrun)')
+    parser.add_argument('--checkpoint', default=None,
+                        help='Resumable checkpoint file, written in the background '
+                             '(default: checkpoint.pt, or student_checkpoint.pt with --distill)')
+    parser.add_argument('--checkpoint-every', type=int, default=1, help='Epochs between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='Continue from --checkpoint if it exists')
+    parser.add_argument('--index', action=argparse.BooleanOptionalAction, default=True,
+                        help='Load samples from dataset/index.sqlite (built on first use); skips undecodable files')
+    parser.add_argument('--refresh-index', action='store_true',
+                        help='Rescan the dataset for new, changed and removed files before training '
+                             '(same as running dataset_index.py)')
+    parser.add_argument('--cache-dir', default=None,
+                        help='Decode the dataset once into memory-mapped arrays here and train from them')
+    parser.add_argument('--quantize', action='store_true',
+                        help='Produce an int8 variant of the best model after training')
+    parser.add_argument('--calibration-samples', type=int, default=512,
+                        help='Validation images used to calibrate quantization')
+    parser.add_argument('--max-accuracy-drop', type=float, default=1.0,
+                        help='Largest accepted int8 accuracy drop in percentage points')
+    parser.add_argument('--distill', metavar='TEACHER_WEIGHTS', default=None,
+                        help='Train the small student network against this trained network '
+                             'and export it to waste_student.pt')
+    parser.add_argument('--temperature', type=float, default=4.0, help='Distillation temperature')
+    parser.add_argument('--distill-alpha', type=float, default=0.9,
+                        help='Weight of the teacher soft labels against the hard labels')
+    args = parser.parse_args()
+    if args.distill and args.quantize:
+        parser.error('--quantize applies to the full network and cannot be combined with --distill')
+    if args.checkpoint is None:
+        args.checkpoint = 'student_checkpoint.pt' if args.distill else 'checkpoint.pt'
+    return args
+
+def run(args):
+    rank, world_size = init_distributed()
+    is_main = rank == 0
+    
+    # Set device; data-parallel training uses gloo and always runs on the CPU
+    device = torch.device('cuda' if torch.cuda.is_available() and world_size == 1 else 'cpu')
+    if is_main:
+        print(f'Using device: {device}' + (f', {world_size} processes' if world_size > 1 else ''))
+    
+    # Data transforms: decoding and cropping can be cached, the rest runs per sample
+    # (the same centre crop the torch backend applies when serving)
+    decode_transform = center_crop_transform()
+    tensor_transform = transforms.Compose([
         transforms.ToTensor(),
         transforms.Normalize(mean=[0.485, 0.456, 0.406], 
                           std=[0.229, 0.224, 0.225])
     ])
+    transform = transforms.Compose([decode_transform, tensor_transform])
+    
+    # The file list comes straight from the manifest. Scanning the dataset
+    # stats every file, so it only happens when asked or when there is no
+    # manifest yet; even then only new or changed files are hashed and
+    # decoded. The first process on each host prepares the index and image
+    # cache while the others wait.
+    prepares_data = int(os.environ.get('LOCAL_RANK', 0)) == 0
+    refresh_index = args.refresh_index or not os.path.exists(os.path.join('dataset', INDEX_FILE))
+    if args.index and refresh_index and prepares_data:
+        with DatasetIndex('dataset') as index:
+            report_index(index, index.refresh())
+    if world_size > 1:
+        dist.barrier()
+    index = DatasetIndex('dataset') if args.index else None
     
     # Create datasets
-    train_dataset = WasteDataset('dataset/train', transform=transform)
-    val_dataset = WasteDataset('dataset/val', transform=transform)
+    if args.cache_dir:
+        datasets = {}
+        for split in ('train', 'val'):
+            root_dir = os.path.join('dataset', split)
+            cache_dir = os.path.join(args.cache_dir, split)
+            if prepares_data and not cache_matches(cache_dir, WasteDataset(root_dir, index=index).images):
+                build_image_cache(root_dir, cache_dir, decode_transform, index=index)
+            if world_size > 1:
+                dist.barrier()
+            datasets[split] = WasteDataset(root_dir, transform=tensor_transform, cache_dir=cache_dir, index=index)
+        train_dataset, val_dataset = datasets['train'], datasets['val']
+    else:
+        train_dataset = WasteDataset('dataset/train', transform=transform, index=index)
+        val_dataset = WasteDataset('dataset/val', transform=transform, index=index)
+    if index is not None:
+        index.close()
     
     # Create data loaders
-    train_loader = DataLoader(train_dataset, batch_size=32, shuffle=True, num_workers=4)
-    val_loader = DataLoader(val_dataset, batch_size=32, shuffle=False, num_workers=4)
+    train_loader = make_loader(train_dataset, args.batch_size, shuffle=True)
+    val_loader = make_loader(val_dataset, args.batch_size, shuffle=False)
     
-    # Initialize model
-    model = WasteClassifier().model
+    # Initialize model, by default from ImageNet weights; DDP broadcasts rank 0's copy
+    teacher = None
+    if args.distill:
+        teacher = build_network()
+        teacher.load_state_dict(torch.load(args.distill, map_location='cpu'))
+        model = build_student_network()
+        save_path = 'waste_student.pth'
+    else:
+        model = build_network(pretrained=args.pretrained)
+        save_path = 'waste_model.pth'
     model = model.to(device)
     
     # Define loss function and optimizer
-    criterion = nn.CrossEntropyLoss()
+    if args.distill:
+        criterion = distillation_loss(args.temperature, args.distill_alpha)
+    else:
+        criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
     
     # Train the model
-    train_model(model, train_loader, val_loader, criterion, optimizer, num_epochs=10, device=device)
+    train_model(model, train_loader, val_loader, criterion, optimizer, num_epochs=args.epochs, device=device,
+                channels_last=args.channels_last, bf16=args.bf16, compile_model=args.compile,
+                save_path=save_path, checkpoint_path=args.checkpoint,
+                checkpoint_every=args.checkpoint_every, resume=args.resume, teacher=teacher)
+    
+    if args.distill and is_main:
+        student = build_student_network()
+        student.load_state_dict(torch.load(save_path, map_location='cpu'))
+        distillation_report(teacher, student, val_dataset, 'waste_student.pt',
+                            'distillation_report.json', batch_size=args.batch_size)
+    
+    if args.quantize and is_main:
+        quantize_and_report(val_dataset, 'waste_model.pth', 'waste_model_int8.pt',
+                            'quantization_report.json', args.calibration_samples,
+                            args.max_accuracy_drop, batch_size=args.batch_size)
+
+def main():
+    args = parse_args()
+    if args.nproc > 1 and 'WORLD_SIZE' not in os.environ:
+        launch_local(run, args.nproc, args)
+    else:
+        run(args)
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
+ 
\ No newline at end of file
@@ -1,10 +1,14 @@
+import hashlib
 import json
 import os
 import io
 import base64
-from datetime import datetime
-import pandas as pd
-import streamlit as st
+import atexit
+import threading
+import time
+from datetime import datetime, timedelta
+
+import metrics
 
 # Create directory for storing classification history
 def ensure_directory(directory):
@@ -15,43 +19,403 @@ def ensure_directory(directory):
 # Create data directory
 ensure_directory("data")
 
-HISTORY_FILE = "classification_history.json"
+# Append-only log, one JSON entry per line
+HISTORY_FILE = "classification_history.jsonl"
 
-def save_classification_history(entry):
-    """Save a classification entry to history file"""
+# Former read-modify-write JSON list, migrated into HISTORY_FILE on first use
+LEGACY_HISTORY_FILE = "classification_history.json"
+
+# Appends are flushed to the OS at once but only fsynced every FSYNC_EVERY
+# entries or FSYNC_INTERVAL seconds, whichever comes first
+FSYNC_EVERY = 32
+FSYNC_INTERVAL = 1.0
+
+# Entries returned by get_classification_history by default
+RECENT_HISTORY = 10
+
+# Set to a database path to keep the history in SQLite (see history_store)
+# instead of the log; an existing log is imported on first use
+HISTORY_DB = os.environ.get("RECYCLEAI_HISTORY_DB")
+
+def _image_dir(path):
+    """Directory next to the log at path holding its images, one file per content hash"""
+    return os.path.splitext(path)[0] + "_images"
+
+def _store_image(image_dir, image):
+    """Write an image under its content hash, once, and return the hash"""
+    digest = hashlib.blake2b(image, digest_size=16).hexdigest()
+    target = os.path.join(image_dir, digest)
+    if not os.path.exists(target):
+        os.makedirs(image_dir, exist_ok=True)
+        tmp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(image)
+        os.replace(tmp_path, target)
+    return digest
+
+def _load_image(image_dir, digest):
     try:
-        # Convert image bytes to base64 string
-        if "image" in entry:
-            entry["image"] = base64.b64encode(entry["image"]).decode('utf-8')
-        
-        # Load existing history
-        history = get_classification_history()
-        
-        # Add new entry
-        history.append(entry)
-        
-        # Keep only last 10 entries
-        history = history[-10:]
-        
-        # Save to file
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(history, f, indent=2)
-            
-    except Exception as e:
-        print(f"Error saving history: {str(e)}")
+        with open(os.path.join(image_dir, digest), 'rb') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _encode_entry(entry, image_dir):
+    """
+    One log line for entry; the image goes to image_dir and the line only
+    references it, so lines stay a few dozen bytes
+    """
+    entry = dict(entry)
+    image = entry.pop("image", None)
+    if isinstance(image, str):
+        # Base64 text from the legacy file
+        image = base64.b64decode(image)
+    if image is not None:
+        entry["image_ref"] = _store_image(image_dir, image)
+    return (json.dumps(entry, separators=(',', ':')) + "\n").encode('utf-8')
+
+def _strip_inline_image(line):
+    """
+    Cut an inline base64 image, as written before images moved out of the
+    log, from a line without parsing it; base64 never contains quotes
+    """
+    start = line.find(b'"image":"')
+    if start < 0:
+        return line
+    end = line.find(b'"', start + len(b'"image":"')) + 1
+    if end == 0:
+        return line
+    if line[start - 1:start] == b',':
+        start -= 1
+    elif line[end:end + 1] == b',':
+        end += 1
+    return line[:start] + line[end:]
 
-def get_classification_history():
-    """Load classification history from file"""
+def _decode_line(line, include_images=True):
+    """Parse one log line; None for a line cut off by a crash"""
+    if not include_images:
+        line = _strip_inline_image(line)
     try:
-        if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r') as f:
-                history = json.load(f)
-                # Convert base64 strings back to bytes for display
-                for entry in history:
-                    if "image" in entry:
-                        entry["image"] = base64.b64decode(entry["image"])
-                return history
+        entry = json.loads(line)
+    except ValueError:
+        return None
+    digest = entry.pop("image_ref", None)
+    if include_images:
+        if digest is not None:
+            image = _load_image(_image_dir(HISTORY_FILE), digest)
+            if image is not None:
+                entry["image"] = image
+        elif "image" in entry:
+            entry["image"] = base64.b64decode(entry["image"])
+    return entry
+
+def _drop_partial_line(path):
+    """
+    Truncate a last line left incomplete by an interrupted append, reading
+    only the end of the file
+    """
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        position = end
+        while position > 0:
+            start = max(0, position - 65536)
+            f.seek(start)
+            block = f.read(position - start)
+            if position == end and block.endswith(b"\n"):
+                return
+            newline = block.rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            position = start
+        f.truncate(0)
+
+def _salvage_entries(text):
+    """
+    The complete entries at the start of a JSON list cut off mid-write
+    """
+    decoder = json.JSONDecoder()
+    entries = []
+    position = text.find('[') + 1
+    if position == 0:
+        return entries
+    while True:
+        while position < len(text) and text[position] in ' \t\r\n,':
+            position += 1
+        try:
+            entry, position = decoder.raw_decode(text, position)
+        except ValueError:
+            return entries
+        if isinstance(entry, dict):
+            entries.append(entry)
+
+def _migrate_legacy_history(path, legacy_path):
+    """
+    Rewrite the old JSON list as a log once; the old file is kept as
+    <legacy_path>.migrated, or as <legacy_path>.corrupt if it did not parse,
+    in which case only the entries before the damage are carried over
+    """
+    with open(legacy_path) as f:
+        text = f.read()
+    try:
+        entries = json.loads(text)
+        suffix = ".migrated"
+    except ValueError:
+        entries = _salvage_entries(text)
+        suffix = ".corrupt"
+        print(f"{legacy_path} is damaged; migrating the {len(entries)} entries before the damage")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.writelines(_encode_entry(entry, _image_dir(path)) for entry in entries)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    os.replace(legacy_path, legacy_path + suffix)
+
+class HistoryLog:
+    """
+    Append-only classification log shared by all sessions of the process
+    
+    Each append is one write() of one line to a file opened in append mode,
+    so it costs the same however long the history is, and concurrent
+    writers never interleave partial entries. Images are kept out of the
+    log, in a directory of files named by content hash (see _encode_entry),
+    so reading the log for statistics never touches image data.
+    """
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(path):
+            _drop_partial_line(path)
+        self._file = open(path, 'ab', buffering=0)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._timer = None
+    
+    def append(self, entry):
+        line = _encode_entry(entry, _image_dir(self.path))
+        with self._lock:
+            self._file.write(line)
+            self._pending += 1
+            if self._pending >= FSYNC_EVERY or time.monotonic() - self._last_sync >= FSYNC_INTERVAL:
+                self._sync_locked()
+            elif self._timer is None:
+                # Make sure a lone append still reaches the disk soon
+                self._timer = threading.Timer(FSYNC_INTERVAL, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+    
+    def _sync_locked(self):
+        if self._pending:
+            os.fsync(self._file.fileno())
+            self._pending = 0
+        self._last_sync = time.monotonic()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+    
+    def sync(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+    
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._sync_locked()
+                self._file.close()
+
+_log = None
+_log_lock = threading.Lock()
+
+def _history_log():
+    """The process-wide HistoryLog for HISTORY_FILE, migrating the legacy file first"""
+    global _log
+    with _log_lock:
+        if _log is None or _log.path != HISTORY_FILE:
+            if _log is not None:
+                _log.close()
+            if not os.path.exists(HISTORY_FILE) and os.path.exists(LEGACY_HISTORY_FILE):
+                try:
+                    _migrate_legacy_history(HISTORY_FILE, LEGACY_HISTORY_FILE)
+                except Exception as e:
+                    # Never let the old file stop new entries being recorded;
+                    # once the log exists the migration is not retried
+                    print(f"Error migrating {LEGACY_HISTORY_FILE}: {str(e)}")
+            _log = HistoryLog(HISTORY_FILE)
+        return _log
+
+@atexit.register
+def _close_history_log():
+    if _log is not None:
+        _log.close()
+
+def _tail_lines(path, count, block_size=65536):
+    """
+    Last count complete lines of a file, read backwards block by block
+    """
+    with open(path, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        while position > 0 and data.count(b"\n") <= count:
+            start = max(0, position - block_size)
+            f.seek(start)
+            data = f.read(position - start) + data
+            position = start
+    lines = data.split(b"\n")
+    # The first piece may be the tail of an earlier line, the last one is empty
+    # or an unfinished append
+    if position > 0:
+        lines = lines[1:]
+    return lines[:-1][-count:] if count else []
+
+def _log_exists():
+    """Whether there is a log to read, migrating the legacy file first if needed"""
+    if not os.path.exists(HISTORY_FILE):
+        if not os.path.exists(LEGACY_HISTORY_FILE):
+            return False
+        _history_log()
+    return True
+
+def _log_lines(path, offset=0, block_size=1 << 22):
+    """
+    Complete lines of a log from byte offset on, read block by block
+    
+    Yields:
+        (line, offset just past the line's newline) pairs; an unfinished
+        append at the end is left for a later call
+    """
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        pending = b""
+        while True:
+            block = f.read(block_size)
+            if not block:
+                return
+            lines = (pending + block).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                offset += len(line) + 1
+                yield line, offset
+
+def _read_history(limit=None, include_images=True):
+    if not _log_exists():
         return []
+    if limit is None:
+        with open(HISTORY_FILE, 'rb') as f:
+            lines = f.read().split(b"\n")[:-1]
+    else:
+        lines = _tail_lines(HISTORY_FILE, limit)
+    entries = (_decode_line(line, include_images) for line in lines)
+    return [entry for entry in entries if entry is not None]
+
+_columns = None
+_columns_lock = threading.Lock()
+
+def _history_columns():
+    """
+    Timestamps, categories and confidences of every logged entry, as lists
+    
+    The log is append-only, so the columns are kept between calls and each
+    call only parses the lines appended since the previous one; the
+    dashboard's three aggregations share a single pass over the file.
+    """
+    global _columns
+    if not _log_exists():
+        return [], [], []
+    with _columns_lock:
+        stat = os.stat(HISTORY_FILE)
+        key = (HISTORY_FILE, stat.st_ino)
+        if _columns is None or _columns['key'] != key or stat.st_size < _columns['offset']:
+            _columns = {'key': key, 'offset': 0, 'timestamp': [], 'category': [], 'confidence': []}
+        if stat.st_size > _columns['offset']:
+            for line, offset in _log_lines(HISTORY_FILE, _columns['offset']):
+                entry = _decode_line(line, include_images=False)
+                if entry is not None:
+                    _columns['timestamp'].append(entry['timestamp'])
+                    _columns['category'].append(entry['category'])
+                    _columns['confidence'].append(entry.get('confidence', 0))
+                _columns['offset'] = offset
+        return _columns['timestamp'][:], _columns['category'][:], _columns['confidence'][:]
+
+# Entries copied from the log into the store per transaction; images are
+# decoded one chunk at a time, so importing never holds the whole history
+IMPORT_CHUNK_SIZE = 2000
+
+_imported_logs = set()
+_import_lock = threading.Lock()
+
+def _import_log(store):
+    """
+    Copy the log into the store once, chunk by chunk
+    
+    Progress is recorded in the database together with each chunk, so an
+    interrupted import resumes where it stopped, and completion is
+    recorded there too, so it is never repeated.
+    """
+    if store.get_meta('log_imported') is not None:
+        return
+    progress = store.get_meta('log_import_offset')
+    if progress is None and len(store):
+        # Filled before imports were recorded, which only happened into an empty store
+        store.set_meta('log_imported', HISTORY_FILE)
+        return
+    
+    if _log_exists():
+        start = end = int(progress or 0)
+        chunk = []
+        for line, end in _log_lines(HISTORY_FILE, start):
+            entry = _decode_line(line)
+            if entry is not None:
+                chunk.append(entry)
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                if not store.import_chunk(chunk, start, end, 'log_import_offset'):
+                    return
+                start = end
+                chunk = []
+        if end != start and not store.import_chunk(chunk, start, end, 'log_import_offset'):
+            return
+    store.set_meta('log_imported', HISTORY_FILE)
+
+def _history_store():
+    """The SQLite store when HISTORY_DB is set, otherwise None"""
+    if not HISTORY_DB:
+        return None
+    from history_store import HistoryStore
+    store = HistoryStore.for_path(HISTORY_DB)
+    if HISTORY_DB not in _imported_logs:
+        # Concurrent first requests wait for a single import
+        with _import_lock:
+            if HISTORY_DB not in _imported_logs:
+                _import_log(store)
+                _imported_logs.add(HISTORY_DB)
+    return store
+
+def save_classification_history(entry):
+    """Append a classification entry to the history log"""
+    with metrics.stage('history_write'):
+        try:
+            store = _history_store()
+            if store is not None:
+                store.append(entry)
+            else:
+                _history_log().append(entry)
+        except Exception as e:
+            print(f"Error saving history: {str(e)}")
+
+def get_classification_history(limit=RECENT_HISTORY):
+    """
+    Load the latest classifications, oldest first
+    
+    Args:
+        limit: Number of entries to read from the end of the log; None
+            reads the whole history
+    """
+    try:
+        store = _history_store()
+        if store is not None:
+            return store.recent(limit)
+        return _read_history(limit)
     except Exception as e:
         print(f"Error loading history: {str(e)}")
         return []
@@ -63,13 +427,23 @@ def get_stats_by_category():
     Returns:
         Dictionary with category counts and average confidence
     """
-    history = get_classification_history()
+    store = _history_store()
+    if store is not None:
+        return [
+            {'category': category, 'count': count, 'avg_confidence': avg_confidence}
+            for category, count, avg_confidence in store.category_stats()
+        ]
+    
+    timestamps, categories, confidences = _history_columns()
     
-    if not history:
+    if not timestamps:
         return {}
     
+    # pandas is only needed for analytics, so it is imported on demand
+    import pandas as pd
+    
     # Convert to DataFrame for easy analysis
-    df = pd.DataFrame(history)
+    df = pd.DataFrame({'category': categories, 'confidence': confidences})
     
     # Group by category
     stats = df.groupby('category').agg(
@@ -86,13 +460,24 @@ def get_stats_over_time():
     Returns:
         DataFrame with daily counts
     """
-    history = get_classification_history()
+    import pandas as pd
+    
+    store = _history_store()
+    if store is not None:
+        rows = store.daily_counts()
+        if not rows:
+            return pd.DataFrame()
+        stats = pd.DataFrame(rows, columns=['date', 'category', 'count'])
+        stats['date'] = pd.to_datetime(stats['date']).dt.date
+        return stats
     
-    if not history:
+    timestamps, categories, _ = _history_columns()
+    
+    if not timestamps:
         return pd.DataFrame()
     
     # Convert to DataFrame for easy analysis
-    df = pd.DataFrame(history)
+    df = pd.DataFrame({'timestamp': timestamps, 'category': categories})
     
     # Convert timestamp to datetime
     df['timestamp'] = pd.to_datetime(df['timestamp'])
@@ -104,3 +489,29 @@ def get_stats_over_time():
     ).reset_index()
     
     return stats
+
+def get_overview_stats():
+    """
+    Headline numbers for the dashboard
+    
+    Returns:
+        Dictionary with the total number of classifications, their average
+        confidence and the number made in the last 24 hours
+    """
+    since = datetime.now() - timedelta(days=1)
+    
+    store = _history_store()
+    if store is not None:
+        return store.overview(since.timestamp())
+    
+    timestamps, _, confidences = _history_columns()
+    if not timestamps:
+        return {'total': 0, 'avg_confidence': 0.0, 'recent_24h': 0}
+    
+    # Timestamps are zero-padded, so string order is time order
+    cutoff = since.strftime("%Y-%m-%d %H:%M:%S")
+    return {
+        'total': len(timestamps),
+        'avg_confidence': sum(confidences) / len(timestamps),
+        'recent_24h': sum(1 for timestamp in timestamps if timestamp > cutoff),
+    }
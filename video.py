@@ -0,0 +1,248 @@
+"""
+Classify conveyor video files and camera streams
+
+    python video.py conveyor.mp4
+    python video.py 0 --window 9          # camera device 0
+
+Frames are read through cv2.VideoCapture and pushed through a generator
+pipeline: sample (skipping frames adaptively to keep up with real time),
+batch, classify with predict_batch, and smooth the per-frame probabilities
+over a sliding window so a single noisy frame does not flip the label.
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from model import INPUT_SIZE, load_model
+
+class StreamStats:
+    """
+    Running counters for one stream
+    
+    Attributes:
+        source_fps: Frame rate reported by the capture (or assumed)
+        read: Frames taken from the source, processed or not
+        processed: Frames that were classified
+        dropped: Frames skipped to keep up with real time
+        seconds_per_frame: Moving average of the decode + classification
+            cost per processed frame
+    """
+    def __init__(self, source_fps):
+        self.source_fps = source_fps
+        self.read = 0
+        self.processed = 0
+        self.dropped = 0
+        self.seconds_per_frame = 0.0
+        self.pending_decode_seconds = 0.0
+        self.started = time.perf_counter()
+    
+    def record_batch(self, frames, seconds):
+        self.processed += frames
+        cost = (seconds + self.pending_decode_seconds) / frames
+        self.pending_decode_seconds = 0.0
+        # Exponential moving average so the skip rate follows load changes
+        if self.seconds_per_frame:
+            self.seconds_per_frame = 0.8 * self.seconds_per_frame + 0.2 * cost
+        else:
+            self.seconds_per_frame = cost
+    
+    @property
+    def processed_fps(self):
+        elapsed = time.perf_counter() - self.started
+        return self.processed / elapsed if elapsed > 0 else 0.0
+    
+    def as_dict(self):
+        return {
+            "source_fps": self.source_fps,
+            "frames_read": self.read,
+            "frames_processed": self.processed,
+            "frames_dropped": self.dropped,
+            "processed_fps": self.processed_fps,
+        }
+
+def open_capture(source):
+    """
+    Open a video file path or a camera index ("0", "1", ...)
+    
+    Raises:
+        ValueError: If the source cannot be opened
+    """
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise ValueError(f"Could not open video source: {source}")
+    return capture
+
+def sample_frames(capture, stats, realtime=True, preprocess=None):
+    """
+    Yield (frame_index, rgb_frame) pairs resized to the model input
+    
+    Frames are scaled to INPUT_SIZE with OpenCV, or passed through
+    preprocess (a backend's own preprocess method, see model.preprocessor)
+    when the model needs a different view of the frame.
+    
+    In real-time mode the classification cost in stats decides how many
+    frames to skip: at cost c per frame and f source frames per second,
+    only every ceil(c * f)-th frame can be classified without falling
+    behind. Skipped frames are only grabbed: with OpenCV's FFmpeg backend
+    grab() still decodes them, but the colour conversion and copy done by
+    retrieve(), and the resize and classification, are skipped.
+    """
+    index = 0
+    while True:
+        if not capture.grab():
+            return
+        stats.read += 1
+        start = time.perf_counter()
+        ok, frame = capture.retrieve()
+        if not ok:
+            return
+        
+        if preprocess is not None:
+            frame = preprocess(Image.fromarray(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)))[0]
+        else:
+            frame = cv2.resize(frame, INPUT_SIZE, interpolation=cv2.INTER_AREA)
+            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        stats.pending_decode_seconds += time.perf_counter() - start
+        yield index, frame
+        index += 1
+        
+        if realtime and stats.seconds_per_frame:
+            skip = math.ceil(stats.seconds_per_frame * stats.source_fps) - 1
+            for _ in range(skip):
+                if not capture.grab():
+                    return
+                stats.read += 1
+                stats.dropped += 1
+                index += 1
+
+def batch_frames(frames, batch_size):
+    """
+    Group (frame_index, frame) pairs into lists of up to batch_size
+    """
+    batch = []
+    for item in frames:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def classify_batches(model, batches, stats):
+    """
+    Yield (frame_index, probabilities) for every frame of every batch
+    """
+    for batch in batches:
+        start = time.perf_counter()
+        predictions = model.predict_batch(np.stack([frame for _, frame in batch]))
+        stats.record_batch(len(batch), time.perf_counter() - start)
+        for (index, _), probs in zip(batch, predictions):
+            yield index, probs
+
+def smooth_predictions(predictions, window):
+    """
+    Average each frame's probabilities with the previous window - 1 frames
+    """
+    recent = deque(maxlen=window)
+    for index, probs in predictions:
+        recent.append(probs)
+        yield index, np.mean(recent, axis=0)
+
+def classify_stream(source, model=None, batch_size=8, window=5, realtime=True, stats_out=None):
+    """
+    Classify a video file or camera stream frame by frame
+    
+    Args:
+        source: Video file path or camera index
+        model: Classifier with predict_batch; defaults to load_model()
+        batch_size: Frames classified together
+        window: Frames averaged for the smoothed label
+        realtime: Skip frames adaptively to keep up with the source frame rate
+        stats_out: Optional list that receives the StreamStats object, so
+            callers can read the counters while or after iterating
+    
+    Yields:
+        Dictionary per processed frame with the frame index, timestamp in
+        seconds, smoothed category, confidence and probabilities
+    """
+    model = model or load_model()
+    capture = open_capture(source)
+    # Cameras often report 0; assume a typical rate for the skip calculation
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    stats = StreamStats(fps)
+    if stats_out is not None:
+        stats_out.append(stats)
+    
+    try:
+        frames = sample_frames(capture, stats, realtime, getattr(model, 'preprocess', None))
+        predictions = classify_batches(model, batch_frames(frames, batch_size), stats)
+        for index, probs in smooth_predictions(predictions, window):
+            predicted_index = int(np.argmax(probs))
+            yield {
+                "frame": index,
+                "timestamp": index / fps,
+                "category": model.categories[predicted_index],
+                "confidence": float(probs[predicted_index] * 100),
+                "probabilities": probs.tolist(),
+            }
+    finally:
+        capture.release()
+
+def write_synthetic_video(path, num_frames=90, fps=30.0, size=(320, 240), seed=0):
+    """
+    Write a small MJPG video with moving coloured blocks, for offline testing
+    """
+    rng = np.random.default_rng(seed)
+    width, height = size
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        raise ValueError(f"Could not create video file: {path}")
+    
+    colors = rng.integers(0, 256, size=(4, 3))
+    try:
+        for i in range(num_frames):
+            frame = np.full((height, width, 3), 40, dtype=np.uint8)
+            color = colors[(i // (num_frames // len(colors) or 1)) % len(colors)]
+            x = (i * 4) % (width - width // 3)
+            frame[height // 4:3 * height // 4, x:x + width // 3] = color
+            frame += rng.integers(0, 12, size=frame.shape, dtype=np.uint8)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a video file or camera stream")
+    parser.add_argument("source", help="Video file path or camera index")
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--window", type=int, default=5, help="Frames in the smoothing window")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="Classify every frame instead of skipping to keep up")
+    parser.add_argument("--jsonl", action="store_true", help="Print one JSON line per frame")
+    args = parser.parse_args()
+    
+    stats_out = []
+    label = None
+    for result in classify_stream(args.source, batch_size=args.batch_size, window=args.window,
+                                  realtime=not args.no_realtime, stats_out=stats_out):
+        if args.jsonl:
+            print(json.dumps(result))
+        elif result["category"] != label:
+            label = result["category"]
+            print(f"{result['timestamp']:8.2f}s  frame {result['frame']:>6}  "
+                  f"{label} ({result['confidence']:.1f}%)")
+    
+    if stats_out:
+        print(json.dumps(stats_out[0].as_dict()), file=sys.stderr)
+
+if __name__ == "__main__":
+    main()